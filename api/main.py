@@ -1,17 +1,51 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 import sqlite3
 import random
+import math
+import time
+import orjson
+import pyarrow as pa
+import pyarrow.ipc as ipc
 from faker import Faker
 import os
 
+from compression import CompressionMiddleware
+
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 fake = Faker()
 
 DATABASE_NAME = "real_estate.db"
 
+RESPONSE_COMPRESSION_ENCODINGS = [
+    encoding.strip() for encoding in os.environ.get("API_COMPRESSION", "zstd,gzip").split(",") if encoding.strip()
+]
+RESPONSE_COMPRESSION_MINIMUM_SIZE = int(os.environ.get("API_COMPRESSION_MINIMUM_SIZE", "1024"))
+RESPONSE_COMPRESSION_GZIP_LEVEL = int(os.environ.get("API_COMPRESSION_GZIP_LEVEL", "6"))
+RESPONSE_COMPRESSION_ZSTD_LEVEL = int(os.environ.get("API_COMPRESSION_ZSTD_LEVEL", "3"))
+
+BULK_NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+BULK_ARROW_STREAM_CONTENT_TYPE = "application/vnd.apache.arrow.stream"
+BULK_ARROW_FILE_CONTENT_TYPE = "application/vnd.apache.arrow.file"
+
+SQLITE_INTEGER_MIN = -2 ** 63
+SQLITE_INTEGER_MAX = 2 ** 63 - 1
+
+dimension_lookup: Dict[str, Dict[Any, Any]] = {}
+
+INSERT_PROPERTY_SQL = """
+    INSERT INTO properties (
+        title, description, property_type_id, city_id, address, neighborhood, zip_code,
+        price, currency, price_per_sqm, bedrooms, bathrooms, half_bathrooms,
+        total_area_sqm, covered_area_sqm, uncovered_area_sqm, lot_area_sqm,
+        construction_year, floors, floor_number, parking_spaces,
+        property_status_id, is_furnished, is_new_construction, immediate_availability,
+        agent_id, latitude, longitude, published_at, updated_at, expires_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 def init_database():
     conn = sqlite3.connect(DATABASE_NAME)
     cursor = conn.cursor()
@@ -154,9 +188,182 @@ def init_database():
     
     cursor.executemany("INSERT OR IGNORE INTO property_status (name, description) VALUES (?, ?)", property_status_data)
     
+    create_indexes(cursor)
+    create_spatial_index(cursor)
+    create_search_index(cursor)
+    create_document_cache(cursor)
+    
     conn.commit()
     conn.close()
 
+def create_indexes(cursor):
+    # (published_at, price) also serves published_at-only lookups, so databases created
+    # with a separate published_at index drop it.
+    cursor.execute("DROP INDEX IF EXISTS idx_properties_published_at")
+    
+    indexes = [
+        "CREATE INDEX IF NOT EXISTS idx_properties_city_published_at ON properties (city_id, published_at)",
+        "CREATE INDEX IF NOT EXISTS idx_properties_type_published_at ON properties (property_type_id, published_at)",
+        "CREATE INDEX IF NOT EXISTS idx_properties_status_published_at ON properties (property_status_id, published_at)",
+        "CREATE INDEX IF NOT EXISTS idx_properties_published_at_price ON properties (published_at, price)",
+        "CREATE INDEX IF NOT EXISTS idx_states_country_id ON states (country_id, name)",
+        "CREATE INDEX IF NOT EXISTS idx_cities_state_id ON cities (state_id, name)",
+        "CREATE INDEX IF NOT EXISTS idx_countries_name ON countries (name)",
+        "CREATE INDEX IF NOT EXISTS idx_states_name ON states (name)",
+        "CREATE INDEX IF NOT EXISTS idx_cities_name ON cities (name)",
+        "CREATE INDEX IF NOT EXISTS idx_property_types_name ON property_types (name)",
+        "CREATE INDEX IF NOT EXISTS idx_property_status_name ON property_status (name)"
+    ]
+    
+    for statement in indexes:
+        cursor.execute(statement)
+    
+    cursor.execute("PRAGMA optimize")
+
+def create_spatial_index(cursor):
+    cursor.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS property_locations USING rtree(
+        id,
+        min_latitude, max_latitude,
+        min_longitude, max_longitude
+    )
+    """)
+    
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS properties_location_insert
+    AFTER INSERT ON properties
+    WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL
+    BEGIN
+        INSERT INTO property_locations (id, min_latitude, max_latitude, min_longitude, max_longitude)
+        VALUES (NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+    END
+    """)
+    
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS properties_location_update
+    AFTER UPDATE OF latitude, longitude ON properties
+    BEGIN
+        DELETE FROM property_locations WHERE id = OLD.id;
+        INSERT INTO property_locations (id, min_latitude, max_latitude, min_longitude, max_longitude)
+        SELECT NEW.id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude
+        WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL;
+    END
+    """)
+    
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS properties_location_delete
+    AFTER DELETE ON properties
+    BEGIN
+        DELETE FROM property_locations WHERE id = OLD.id;
+    END
+    """)
+    
+    # Backfill rows inserted before the index existed.
+    cursor.execute("""
+    INSERT INTO property_locations (id, min_latitude, max_latitude, min_longitude, max_longitude)
+    SELECT id, latitude, latitude, longitude, longitude
+    FROM properties
+    WHERE latitude IS NOT NULL
+      AND longitude IS NOT NULL
+      AND id NOT IN (SELECT id FROM property_locations)
+    """)
+
+def create_search_index(cursor):
+    cursor.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS properties_fts USING fts5(
+        title,
+        description,
+        content='properties',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """)
+    
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS properties_fts_insert
+    AFTER INSERT ON properties
+    BEGIN
+        INSERT INTO properties_fts (rowid, title, description)
+        VALUES (NEW.id, NEW.title, NEW.description);
+    END
+    """)
+    
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS properties_fts_update
+    AFTER UPDATE OF title, description ON properties
+    BEGIN
+        INSERT INTO properties_fts (properties_fts, rowid, title, description)
+        VALUES ('delete', OLD.id, OLD.title, OLD.description);
+        INSERT INTO properties_fts (rowid, title, description)
+        VALUES (NEW.id, NEW.title, NEW.description);
+    END
+    """)
+    
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS properties_fts_delete
+    AFTER DELETE ON properties
+    BEGIN
+        INSERT INTO properties_fts (properties_fts, rowid, title, description)
+        VALUES ('delete', OLD.id, OLD.title, OLD.description);
+    END
+    """)
+    
+    # Index rows inserted before the search index existed.
+    cursor.execute("SELECT COUNT(*) FROM properties_fts_docsize")
+    indexed_rows = cursor.fetchone()[0]
+    cursor.execute("SELECT COUNT(*) FROM properties")
+    property_rows = cursor.fetchone()[0]
+    if indexed_rows != property_rows:
+        cursor.execute("INSERT INTO properties_fts (properties_fts) VALUES ('rebuild')")
+
+def create_document_cache(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS property_documents (
+        property_id INTEGER PRIMARY KEY,
+        document BLOB NOT NULL,
+        FOREIGN KEY (property_id) REFERENCES properties(id) ON DELETE CASCADE
+    )
+    """)
+    
+    # Invalidation only drops stale entries; they are rebuilt at the next startup, and
+    # until then reads serialize the missing documents in memory.
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS property_documents_update
+    AFTER UPDATE ON properties
+    BEGIN
+        DELETE FROM property_documents WHERE property_id = OLD.id;
+    END
+    """)
+    
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS property_documents_delete
+    AFTER DELETE ON properties
+    BEGIN
+        DELETE FROM property_documents WHERE property_id = OLD.id;
+    END
+    """)
+    
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS property_documents_agent_update
+    AFTER UPDATE ON agents
+    BEGIN
+        DELETE FROM property_documents
+        WHERE property_id IN (SELECT id FROM properties WHERE agent_id = OLD.id);
+    END
+    """)
+    
+    for table in ["countries", "states", "cities", "property_types", "property_status"]:
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS property_documents_{table}_update
+        AFTER UPDATE ON {table}
+        BEGIN
+            DELETE FROM property_documents;
+        END
+        """)
+    
+    # Cache rows inserted before the document cache existed.
+    refresh_property_documents(cursor)
+
 def clear_sample_data():
     conn = sqlite3.connect(DATABASE_NAME)
     cursor = conn.cursor()
@@ -170,6 +377,8 @@ def clear_sample_data():
     
     conn.commit()
     conn.close()
+    
+    dimension_lookup.clear()
 
 def create_countries():
     conn = sqlite3.connect(DATABASE_NAME)
@@ -323,16 +532,7 @@ def create_properties():
         updated_at = published_at + timedelta(days=random.randint(0, 30))
         expires_at = published_at + timedelta(days=random.randint(90, 365))
         
-        cursor.execute("""
-            INSERT INTO properties (
-                title, description, property_type_id, city_id, address, neighborhood, zip_code,
-                price, currency, price_per_sqm, bedrooms, bathrooms, half_bathrooms,
-                total_area_sqm, covered_area_sqm, uncovered_area_sqm, lot_area_sqm,
-                construction_year, floors, floor_number, parking_spaces,
-                property_status_id, is_furnished, is_new_construction, immediate_availability,
-                agent_id, latitude, longitude, published_at, updated_at, expires_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        cursor.execute(INSERT_PROPERTY_SQL, (
             title, description, property_type_id, city_id, address, neighborhood, zip_code,
             price, currency, price_per_sqm, bedrooms, bathrooms, half_bathrooms,
             total_area, covered_area, uncovered_area, lot_area,
@@ -341,6 +541,8 @@ def create_properties():
             agent_id, latitude, longitude, published_at, updated_at, expires_at
         ))
     
+    refresh_property_documents(cursor)
+    
     conn.commit()
     conn.close()
 
@@ -408,16 +610,7 @@ def create_new_properties():
         
         expires_at = current_time + timedelta(days=random.randint(90, 365))
         
-        cursor.execute("""
-            INSERT INTO properties (
-                title, description, property_type_id, city_id, address, neighborhood, zip_code,
-                price, currency, price_per_sqm, bedrooms, bathrooms, half_bathrooms,
-                total_area_sqm, covered_area_sqm, uncovered_area_sqm, lot_area_sqm,
-                construction_year, floors, floor_number, parking_spaces,
-                property_status_id, is_furnished, is_new_construction, immediate_availability,
-                agent_id, latitude, longitude, published_at, updated_at, expires_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        cursor.execute(INSERT_PROPERTY_SQL, (
             title, description, property_type_id, city_id, address, neighborhood, zip_code,
             price, currency, price_per_sqm, bedrooms, bathrooms, half_bathrooms,
             total_area, covered_area, uncovered_area, lot_area,
@@ -435,13 +628,210 @@ def create_new_properties():
             "published_at": current_time.isoformat()
         })
     
+    refresh_property_documents(cursor, [prop["id"] for prop in properties_created])
+    
     conn.commit()
     conn.close()
     
     return properties_created
   
 
-def get_properties_by_date_range(from_date: str, to_date: str) -> List[Dict[str, Any]]:
+PROPERTY_COLUMNS = """
+SELECT 
+    p.id,
+    p.title,
+    p.description,
+    pt.name as property_type,
+    c.name as city_name,
+    s.name as state_name,
+    co.name as country_name,
+    p.address,
+    p.neighborhood,
+    p.zip_code,
+    p.price,
+    p.currency,
+    p.price_per_sqm,
+    p.bedrooms,
+    p.bathrooms,
+    p.half_bathrooms,
+    p.total_area_sqm,
+    p.covered_area_sqm,
+    p.uncovered_area_sqm,
+    p.lot_area_sqm,
+    p.construction_year,
+    p.floors,
+    p.floor_number,
+    p.parking_spaces,
+    ps.name as property_status,
+    p.is_furnished,
+    p.is_new_construction,
+    p.immediate_availability,
+    a.name as agent_name,
+    a.email as agent_email,
+    a.phone as agent_phone,
+    a.company as agent_company,
+    p.latitude,
+    p.longitude,
+    p.published_at,
+    p.updated_at,
+    p.expires_at
+"""
+
+PROPERTY_FROM = """
+FROM properties p
+JOIN property_types pt ON p.property_type_id = pt.id
+JOIN cities c ON p.city_id = c.id
+JOIN states s ON c.state_id = s.id
+JOIN countries co ON s.country_id = co.id
+JOIN property_status ps ON p.property_status_id = ps.id
+LEFT JOIN agents a ON p.agent_id = a.id
+"""
+
+PROPERTY_SELECT = PROPERTY_COLUMNS + PROPERTY_FROM
+
+def build_property_document(row) -> Dict[str, Any]:
+    return {
+        "id": row[0],
+        "title": row[1],
+        "description": row[2],
+        "property_type": row[3],
+        "location": {
+            "city": row[4],
+            "state": row[5],
+            "country": row[6],
+            "address": row[7],
+            "neighborhood": row[8],
+            "zip_code": row[9],
+            "coordinates": {
+                "latitude": float(row[32]) if row[32] else None,
+                "longitude": float(row[33]) if row[33] else None
+            }
+        },
+        "pricing": {
+            "price": float(row[10]),
+            "currency": row[11],
+            "price_per_sqm": float(row[12]) if row[12] else None
+        },
+        "features": {
+            "bedrooms": row[13],
+            "bathrooms": row[14],
+            "half_bathrooms": row[15],
+            "total_area_sqm": float(row[16]) if row[16] else None,
+            "covered_area_sqm": float(row[17]) if row[17] else None,
+            "uncovered_area_sqm": float(row[18]) if row[18] else None,
+            "lot_area_sqm": float(row[19]) if row[19] else None,
+            "construction_year": row[20],
+            "floors": row[21],
+            "floor_number": row[22],
+            "parking_spaces": row[23]
+        },
+        "status": {
+            "property_status": row[24],
+            "is_furnished": bool(row[25]),
+            "is_new_construction": bool(row[26]),
+            "immediate_availability": bool(row[27])
+        },
+        "agent": {
+            "name": row[28],
+            "email": row[29],
+            "phone": row[30],
+            "company": row[31]
+        } if row[28] else None,
+        "dates": {
+            "published_at": row[34],
+            "updated_at": row[35],
+            "expires_at": row[36]
+        }
+    }
+
+def build_property_documents(cursor, property_ids: List[int]) -> Dict[int, bytes]:
+    rows = []
+    for start in range(0, len(property_ids), 500):
+        chunk = property_ids[start:start + 500]
+        placeholders = ", ".join("?" for _ in chunk)
+        cursor.execute(f"{PROPERTY_SELECT} WHERE p.id IN ({placeholders})", chunk)
+        rows.extend(cursor.fetchall())
+    return {row[0]: orjson.dumps(build_property_document(row)) for row in rows}
+
+def stream_missing_documents(cursor, batch_size: int = 1000):
+    cursor.execute(f"""
+    {PROPERTY_SELECT}
+    WHERE p.id NOT IN (SELECT property_id FROM property_documents)
+    """)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            yield row[0], orjson.dumps(build_property_document(row))
+
+def refresh_property_documents(cursor, property_ids: Optional[List[int]] = None):
+    if property_ids is None:
+        # Streamed in batches so a backfill of a large table never holds every document;
+        # the read uses its own cursor because executemany runs on this one.
+        documents = stream_missing_documents(cursor.connection.cursor())
+    else:
+        documents = build_property_documents(cursor, property_ids).items()
+    
+    cursor.executemany(
+        "INSERT OR REPLACE INTO property_documents (property_id, document) VALUES (?, ?)",
+        documents
+    )
+
+def fill_missing_documents(cursor, rows) -> List[bytes]:
+    missing_ids = [row[0] for row in rows if row[1] is None]
+    if not missing_ids:
+        return [row[1] for row in rows]
+    
+    # Reads never write the cache back, so they do not contend for the write lock.
+    missing_documents = build_property_documents(cursor, missing_ids)
+    return [document if document is not None else missing_documents[property_id] for property_id, document in rows]
+
+def build_properties_response(envelope: Dict[str, Any], documents: List[bytes]) -> Response:
+    # Cached documents are already JSON, so they are spliced in without re-encoding.
+    body = orjson.dumps(envelope)[:-1] + b',"properties":[' + b",".join(documents) + b"]}"
+    return Response(content=body, media_type="application/json")
+
+def build_property_filters(
+    country: Optional[str] = None,
+    state: Optional[str] = None,
+    city: Optional[str] = None,
+    property_type: Optional[str] = None,
+    status: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_area: Optional[float] = None,
+    max_area: Optional[float] = None
+):
+    conditions = []
+    params = []
+    
+    equality_filters = [
+        ("co.name", country),
+        ("s.name", state),
+        ("c.name", city),
+        ("pt.name", property_type),
+        ("ps.name", status)
+    ]
+    for column, value in equality_filters:
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    
+    range_filters = [
+        ("p.price >= ?", min_price),
+        ("p.price <= ?", max_price),
+        ("p.total_area_sqm >= ?", min_area),
+        ("p.total_area_sqm <= ?", max_area)
+    ]
+    for condition, value in range_filters:
+        if value is not None:
+            conditions.append(condition)
+            params.append(value)
+    
+    return conditions, params
+
+def get_properties_by_date_range(from_date: str, to_date: str, **filters) -> List[bytes]:
     conn = sqlite3.connect(DATABASE_NAME)
     cursor = conn.cursor()
 
@@ -462,124 +852,539 @@ def get_properties_by_date_range(from_date: str, to_date: str) -> List[Dict[str,
     if from_datetime > to_datetime:
         raise ValueError("from_date must be earlier than or equal to to_date.")
     
-    query = """
-    SELECT 
-        p.id,
-        p.title,
-        p.description,
-        pt.name as property_type,
-        c.name as city_name,
-        s.name as state_name,
-        co.name as country_name,
-        p.address,
-        p.neighborhood,
-        p.zip_code,
-        p.price,
-        p.currency,
-        p.price_per_sqm,
-        p.bedrooms,
-        p.bathrooms,
-        p.half_bathrooms,
-        p.total_area_sqm,
-        p.covered_area_sqm,
-        p.uncovered_area_sqm,
-        p.lot_area_sqm,
-        p.construction_year,
-        p.floors,
-        p.floor_number,
-        p.parking_spaces,
-        ps.name as property_status,
-        p.is_furnished,
-        p.is_new_construction,
-        p.immediate_availability,
-        a.name as agent_name,
-        a.email as agent_email,
-        a.phone as agent_phone,
-        a.company as agent_company,
-        p.latitude,
-        p.longitude,
-        p.published_at,
-        p.updated_at,
-        p.expires_at
-    FROM properties p
-    JOIN property_types pt ON p.property_type_id = pt.id
-    JOIN cities c ON p.city_id = c.id
-    JOIN states s ON c.state_id = s.id
-    JOIN countries co ON s.country_id = co.id
-    JOIN property_status ps ON p.property_status_id = ps.id
-    LEFT JOIN agents a ON p.agent_id = a.id
-    WHERE p.published_at BETWEEN ? AND ?
+    filter_conditions, filter_params = build_property_filters(**filters)
+    where_clause = " AND ".join(["p.published_at BETWEEN ? AND ?"] + filter_conditions)
+    
+    query = f"""
+    SELECT p.id, d.document
+    {PROPERTY_FROM}
+    LEFT JOIN property_documents d ON d.property_id = p.id
+    WHERE {where_clause}
     ORDER BY p.published_at DESC
     """
-    cursor.execute(query, (from_datetime.isoformat(sep=" "), to_datetime.isoformat(sep=" ")))
+    cursor.execute(query, (from_datetime.isoformat(sep=" "), to_datetime.isoformat(sep=" "), *filter_params))
     rows = cursor.fetchall()
     
+    properties = fill_missing_documents(cursor, rows)
+    
+    conn.close()
+    return properties
+
+EARTH_RADIUS_KM = 6371.0088
+
+# float32 R*Tree coordinates are off by up to ~1.5e-5 degrees; the margins cover that
+# with room to spare (1e-4 degrees is about 11 m, at most ~16 m diagonally).
+RTREE_MARGIN_DEGREES = 1e-4
+RTREE_MARGIN_KM = 0.02
+RTREE_CANDIDATE_MARGIN = 16
+
+def haversine_km(latitude_1: float, longitude_1: float, latitude_2: float, longitude_2: float) -> float:
+    phi_1 = math.radians(latitude_1)
+    phi_2 = math.radians(latitude_2)
+    delta_phi = phi_2 - phi_1
+    delta_lambda = math.radians(longitude_2 - longitude_1)
+    
+    a = math.sin(delta_phi / 2) ** 2 + math.cos(phi_1) * math.cos(phi_2) * math.sin(delta_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def radius_bounding_box(latitude: float, longitude: float, radius_km: float):
+    delta_latitude = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_latitude = math.cos(math.radians(latitude))
+    if cos_latitude < 1e-9:
+        delta_longitude = 180.0
+    else:
+        delta_longitude = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_latitude)))
+    
+    # Longitudes wrap at the antimeridian, so a circle crossing it needs two ranges;
+    # one reaching a pole spans every longitude.
+    min_longitude = longitude - delta_longitude
+    max_longitude = longitude + delta_longitude
+    if delta_longitude >= 180.0 or abs(latitude) + delta_latitude >= 90.0:
+        longitude_ranges = [(-180.0, 180.0)]
+    elif min_longitude < -180.0:
+        longitude_ranges = [(min_longitude + 360.0, 180.0), (-180.0, max_longitude)]
+    elif max_longitude > 180.0:
+        longitude_ranges = [(min_longitude, 180.0), (-180.0, max_longitude - 360.0)]
+    else:
+        longitude_ranges = [(min_longitude, max_longitude)]
+    
+    return (
+        max(-90.0, latitude - delta_latitude),
+        min(90.0, latitude + delta_latitude),
+        longitude_ranges
+    )
+
+def get_properties_near(
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    radius_km: Optional[float] = None,
+    min_latitude: Optional[float] = None,
+    max_latitude: Optional[float] = None,
+    min_longitude: Optional[float] = None,
+    max_longitude: Optional[float] = None,
+    limit: int = 100
+) -> List[Dict[str, Any]]:
+    bounding_box = (min_latitude, max_latitude, min_longitude, max_longitude)
+    has_bounding_box = all(value is not None for value in bounding_box)
+    has_center = latitude is not None and longitude is not None
+    
+    for name, value, bound in [
+        ("latitude", latitude, 90), ("min_latitude", min_latitude, 90), ("max_latitude", max_latitude, 90),
+        ("longitude", longitude, 180), ("min_longitude", min_longitude, 180), ("max_longitude", max_longitude, 180)
+    ]:
+        if value is not None and not (math.isfinite(value) and -bound <= value <= bound):
+            raise ValueError(f"{name} must be a number between -{bound} and {bound}.")
+    if radius_km is not None and not math.isfinite(radius_km):
+        raise ValueError("radius_km must be a finite number.")
+    
+    if any(value is not None for value in bounding_box) and not has_bounding_box:
+        raise ValueError("Bounding box requires min_latitude, max_latitude, min_longitude and max_longitude.")
+    if (latitude is None) != (longitude is None):
+        raise ValueError("latitude and longitude must be provided together.")
+    if radius_km is not None and (radius_km <= 0 or not has_center):
+        raise ValueError("radius_km must be positive and requires latitude and longitude.")
+    if limit <= 0:
+        raise ValueError("limit must be positive.")
+    
+    if has_bounding_box:
+        if min_latitude > max_latitude or min_longitude > max_longitude:
+            raise ValueError("Bounding box minimums must be lower than or equal to maximums.")
+        if not has_center:
+            latitude = (min_latitude + max_latitude) / 2
+            longitude = (min_longitude + max_longitude) / 2
+        longitude_ranges = [(min_longitude, max_longitude)]
+    elif has_center and radius_km is not None:
+        min_latitude, max_latitude, longitude_ranges = radius_bounding_box(latitude, longitude, radius_km)
+    else:
+        raise ValueError("Provide latitude, longitude and radius_km, or a bounding box.")
+    
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    
+    # The R*Tree stores float32 coordinates, so the box and radius are widened by its
+    # rounding error. Candidates are ranked on those coordinates and loaded in batches
+    # with PROPERTY_SELECT; the exact tests and ranking use the loaded latitude and
+    # longitude. Loading stops once no remaining candidate can be nearer than the
+    # `limit`-th exact match.
+    candidate_distances = {}
+    for range_min_longitude, range_max_longitude in longitude_ranges:
+        cursor.execute("""
+        SELECT id, min_latitude, min_longitude FROM property_locations
+        WHERE max_latitude >= ? AND min_latitude <= ?
+          AND max_longitude >= ? AND min_longitude <= ?
+        """, (
+            min_latitude - RTREE_MARGIN_DEGREES, max_latitude + RTREE_MARGIN_DEGREES,
+            range_min_longitude - RTREE_MARGIN_DEGREES, range_max_longitude + RTREE_MARGIN_DEGREES
+        ))
+        
+        for property_id, row_latitude, row_longitude in cursor:
+            distance_km = haversine_km(latitude, longitude, row_latitude, row_longitude)
+            if radius_km is not None and distance_km > radius_km + RTREE_MARGIN_KM:
+                continue
+            candidate_distances[property_id] = distance_km
+    candidates = sorted((distance_km, property_id) for property_id, distance_km in candidate_distances.items())
+    
+    matches = []
+    batch_size = limit + RTREE_CANDIDATE_MARGIN
+    for start in range(0, len(candidates), batch_size):
+        if len(matches) >= limit:
+            matches.sort(key=lambda match: match[0])
+            if candidates[start][0] > matches[limit - 1][0] + RTREE_MARGIN_KM:
+                break
+        
+        batch_ids = [property_id for _, property_id in candidates[start:start + batch_size]]
+        for chunk_start in range(0, len(batch_ids), 500):
+            chunk = batch_ids[chunk_start:chunk_start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor.execute(f"{PROPERTY_SELECT} WHERE p.id IN ({placeholders})", chunk)
+            for row in cursor.fetchall():
+                row_latitude = float(row[32])
+                row_longitude = float(row[33])
+                if has_bounding_box and not (
+                    min_latitude <= row_latitude <= max_latitude and min_longitude <= row_longitude <= max_longitude
+                ):
+                    continue
+                distance_km = haversine_km(latitude, longitude, row_latitude, row_longitude)
+                if radius_km is not None and distance_km > radius_km:
+                    continue
+                matches.append((distance_km, row))
+    conn.close()
+    
+    matches.sort(key=lambda match: match[0])
+    
     properties = []
-    for row in rows:
-        property_data = {
-            "id": row[0],
-            "title": row[1],
-            "description": row[2],
-            "property_type": row[3],
-            "location": {
-                "city": row[4],
-                "state": row[5],
-                "country": row[6],
-                "address": row[7],
-                "neighborhood": row[8],
-                "zip_code": row[9],
-                "coordinates": {
-                    "latitude": float(row[32]) if row[32] else None,
-                    "longitude": float(row[33]) if row[33] else None
-                }
-            },
-            "pricing": {
-                "price": float(row[10]),
-                "currency": row[11],
-                "price_per_sqm": float(row[12]) if row[12] else None
-            },
-            "features": {
-                "bedrooms": row[13],
-                "bathrooms": row[14],
-                "half_bathrooms": row[15],
-                "total_area_sqm": float(row[16]) if row[16] else None,
-                "covered_area_sqm": float(row[17]) if row[17] else None,
-                "uncovered_area_sqm": float(row[18]) if row[18] else None,
-                "lot_area_sqm": float(row[19]) if row[19] else None,
-                "construction_year": row[20],
-                "floors": row[21],
-                "floor_number": row[22],
-                "parking_spaces": row[23]
-            },
-            "status": {
-                "property_status": row[24],
-                "is_furnished": bool(row[25]),
-                "is_new_construction": bool(row[26]),
-                "immediate_availability": bool(row[27])
-            },
-            "agent": {
-                "name": row[28],
-                "email": row[29],
-                "phone": row[30],
-                "company": row[31]
-            } if row[28] else None,
-            "dates": {
-                "published_at": row[34],
-                "updated_at": row[35],
-                "expires_at": row[36]
-            }
-        }
+    for distance_km, row in matches[:limit]:
+        property_data = build_property_document(row)
+        property_data["distance_km"] = round(distance_km, 3)
         properties.append(property_data)
     
-    conn.close()
     return properties
 
+def build_search_query(q: str) -> str:
+    terms = []
+    for term in q.split():
+        is_prefix = term.endswith("*") and len(term) > 1
+        term = term.rstrip("*").replace('"', '""')
+        if term:
+            terms.append(f'"{term}"*' if is_prefix else f'"{term}"')
+    
+    if not terms:
+        raise ValueError("Search query must contain at least one term.")
+    
+    return " ".join(terms)
+
+def search_properties(q: str, limit: int = 20, offset: int = 0):
+    if limit <= 0 or offset < 0:
+        raise ValueError("limit must be positive and offset must not be negative.")
+    
+    match_query = build_search_query(q)
+    
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT COUNT(*) FROM properties_fts WHERE properties_fts MATCH ?", (match_query,))
+    total_matches = cursor.fetchone()[0]
+    
+    # Rank and paginate inside the FTS index, then join only the requested page.
+    query = f"""
+    WITH matches AS (
+        SELECT rowid AS id, rank
+        FROM properties_fts
+        WHERE properties_fts MATCH ?
+        ORDER BY rank
+        LIMIT ? OFFSET ?
+    )
+    SELECT p.id, d.document
+    {PROPERTY_FROM}
+    JOIN matches m ON m.id = p.id
+    LEFT JOIN property_documents d ON d.property_id = p.id
+    ORDER BY m.rank
+    """
+    cursor.execute(query, (match_query, limit, offset))
+    rows = cursor.fetchall()
+    
+    properties = fill_missing_documents(cursor, rows)
+    
+    conn.close()
+    return total_matches, properties
+
+def load_dimension_lookup(cursor, refresh: bool = False) -> Dict[str, Dict[Any, Any]]:
+    if dimension_lookup and not refresh:
+        return dimension_lookup
+    
+    lookup = {"property_types": {}, "property_status": {}, "cities": {}, "city_names": {}, "agents": {}}
+    
+    cursor.execute("SELECT id, name FROM property_types ORDER BY id")
+    for type_id, name in cursor.fetchall():
+        lookup["property_types"].setdefault(name.lower(), type_id)
+    
+    cursor.execute("SELECT id, name FROM property_status ORDER BY id")
+    for status_id, name in cursor.fetchall():
+        lookup["property_status"].setdefault(name.lower(), status_id)
+    
+    cursor.execute("""
+    SELECT c.id, c.name, s.name, co.name
+    FROM cities c
+    JOIN states s ON c.state_id = s.id
+    JOIN countries co ON s.country_id = co.id
+    """)
+    for city_id, city, state, country in cursor.fetchall():
+        lookup["cities"][(country.lower(), state.lower(), city.lower())] = city_id
+        # City names shared by several states resolve to None and need state and country.
+        city_key = city.lower()
+        lookup["city_names"][city_key] = None if city_key in lookup["city_names"] else city_id
+    
+    cursor.execute("SELECT id, email FROM agents WHERE email IS NOT NULL")
+    for agent_id, email in cursor.fetchall():
+        lookup["agents"][email.lower()] = agent_id
+    
+    dimension_lookup.clear()
+    dimension_lookup.update(lookup)
+    return dimension_lookup
+
+def resolve_dimension(cursor, table: str, key, batch_state: Dict[str, bool]):
+    lookup = load_dimension_lookup(cursor)
+    if key in lookup[table] or batch_state["refreshed"]:
+        return lookup[table].get(key)
+    
+    # Dimensions may have been added since the lookup was loaded; reload at most once
+    # per batch so repeated misses are rejected without going back to the database.
+    batch_state["refreshed"] = True
+    lookup = load_dimension_lookup(cursor, refresh=True)
+    return lookup[table].get(key)
+
+def flatten_listing(listing: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    flat = {}
+    for key, value in listing.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_listing(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+def parse_bulk_listings(body: bytes, content_type: str):
+    listings = []
+    errors = []
+    
+    if content_type in BULK_NDJSON_CONTENT_TYPES:
+        index = 0
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                listing = orjson.loads(line)
+                if not isinstance(listing, dict):
+                    raise ValueError("Each line must be a JSON object.")
+                listings.append((index, listing))
+            except (orjson.JSONDecodeError, ValueError) as e:
+                errors.append({"index": index, "error": f"Invalid JSON: {str(e)}"})
+            index += 1
+    elif content_type in (BULK_ARROW_STREAM_CONTENT_TYPE, BULK_ARROW_FILE_CONTENT_TYPE):
+        try:
+            if content_type == BULK_ARROW_STREAM_CONTENT_TYPE:
+                table = ipc.open_stream(body).read_all()
+            else:
+                table = ipc.open_file(pa.BufferReader(body)).read_all()
+        except pa.ArrowInvalid as e:
+            raise ValueError(f"Invalid Arrow payload: {str(e)}")
+        listings = list(enumerate(table.to_pylist()))
+    else:
+        raise ValueError(
+            "Unsupported content type. Use application/x-ndjson or application/vnd.apache.arrow.stream."
+        )
+    
+    return listings, errors
+
+def to_optional_float(flat: Dict[str, Any], name: str, minimum: Optional[float] = None, maximum: Optional[float] = None):
+    value = flat.get(name)
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number.")
+    if math.isnan(value):
+        return None
+    if not math.isfinite(value):
+        raise ValueError(f"{name} must be a finite number.")
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise ValueError(f"{name} is out of range.")
+    return value
+
+def to_optional_int(flat: Dict[str, Any], name: str, default: Optional[int] = None):
+    value = flat.get(name)
+    if value is None:
+        return default
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"{name} must be an integer.")
+    try:
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{name} must be an integer.")
+    if not SQLITE_INTEGER_MIN <= value <= SQLITE_INTEGER_MAX:
+        raise ValueError(f"{name} is out of range.")
+    return value
+
+def to_optional_text(flat: Dict[str, Any], name: str, default: Optional[str] = None) -> Optional[str]:
+    value = flat.get(name)
+    if value is None:
+        return default
+    if not isinstance(value, str):
+        raise ValueError(f"{name} must be a string.")
+    return value
+
+def to_flag(flat: Dict[str, Any], name: str, default: int) -> int:
+    value = flat.get(name)
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return 1 if value.strip().lower() in ("1", "true", "yes") else 0
+    return 1 if value else 0
+
+def to_optional_datetime(flat: Dict[str, Any], name: str) -> Optional[str]:
+    value = flat.get(name)
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"{name} must be an ISO 8601 datetime.")
+    if not isinstance(value, datetime):
+        raise ValueError(f"{name} must be an ISO 8601 datetime.")
+    # Stored datetimes are naive local time, like datetime.now() elsewhere; offsets
+    # are converted rather than dropped.
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.isoformat(sep=" ")
+
+def build_bulk_property_row(
+    cursor,
+    listing: Dict[str, Any],
+    current_time: str,
+    batch_state: Dict[str, bool],
+    earliest_published_at: Optional[str] = None
+):
+    flat = flatten_listing(listing)
+    
+    title = to_optional_text(flat, "title")
+    if not title:
+        raise ValueError("title is required.")
+    
+    property_type = flat.get("property_type")
+    if not property_type:
+        raise ValueError("property_type is required.")
+    property_type_id = resolve_dimension(cursor, "property_types", str(property_type).lower(), batch_state)
+    if property_type_id is None:
+        raise ValueError(f"Unknown property_type: {property_type}")
+    
+    city = flat.get("location.city")
+    if not city:
+        raise ValueError("location.city is required.")
+    state = flat.get("location.state")
+    country = flat.get("location.country")
+    if state and country:
+        city_id = resolve_dimension(cursor, "cities", (str(country).lower(), str(state).lower(), str(city).lower()), batch_state)
+    else:
+        city_id = resolve_dimension(cursor, "city_names", str(city).lower(), batch_state)
+    if city_id is None:
+        raise ValueError(f"Unknown or ambiguous city: {city}")
+    
+    status = flat.get("status.property_status") or "Active"
+    property_status_id = resolve_dimension(cursor, "property_status", str(status).lower(), batch_state)
+    if property_status_id is None:
+        raise ValueError(f"Unknown property_status: {status}")
+    
+    agent_id = None
+    agent_email = flat.get("agent.email")
+    if agent_email:
+        agent_id = resolve_dimension(cursor, "agents", str(agent_email).lower(), batch_state)
+        if agent_id is None:
+            raise ValueError(f"Unknown agent email: {agent_email}")
+    
+    price = to_optional_float(flat, "pricing.price", minimum=0)
+    if price is None:
+        raise ValueError("pricing.price is required.")
+    
+    total_area = to_optional_float(flat, "features.total_area_sqm", minimum=0)
+    price_per_sqm = to_optional_float(flat, "pricing.price_per_sqm", minimum=0)
+    if price_per_sqm is None and total_area:
+        price_per_sqm = round(price / total_area, 2)
+    
+    published_at = to_optional_datetime(flat, "dates.published_at")
+    # The ETL extracts from the second after its latest published_at, so an older
+    # listing would never reach bronze.
+    if published_at is not None and earliest_published_at is not None and published_at < earliest_published_at:
+        raise ValueError(
+            f"dates.published_at must not be earlier than {earliest_published_at}; "
+            "older listings are not picked up by the incremental ETL."
+        )
+    published_at = published_at or current_time
+    updated_at = to_optional_datetime(flat, "dates.updated_at") or published_at
+    
+    return (
+        title, to_optional_text(flat, "description"), property_type_id, city_id,
+        to_optional_text(flat, "location.address"),
+        to_optional_text(flat, "location.neighborhood"),
+        to_optional_text(flat, "location.zip_code"),
+        price, to_optional_text(flat, "pricing.currency") or "USD", price_per_sqm,
+        to_optional_int(flat, "features.bedrooms"),
+        to_optional_int(flat, "features.bathrooms"),
+        to_optional_int(flat, "features.half_bathrooms", default=0),
+        total_area,
+        to_optional_float(flat, "features.covered_area_sqm", minimum=0),
+        to_optional_float(flat, "features.uncovered_area_sqm", minimum=0),
+        to_optional_float(flat, "features.lot_area_sqm", minimum=0),
+        to_optional_int(flat, "features.construction_year"),
+        to_optional_int(flat, "features.floors", default=1),
+        to_optional_int(flat, "features.floor_number"),
+        to_optional_int(flat, "features.parking_spaces", default=0),
+        property_status_id,
+        to_flag(flat, "status.is_furnished", 0),
+        to_flag(flat, "status.is_new_construction", 0),
+        to_flag(flat, "status.immediate_availability", 1),
+        agent_id,
+        to_optional_float(flat, "location.coordinates.latitude", minimum=-90, maximum=90),
+        to_optional_float(flat, "location.coordinates.longitude", minimum=-180, maximum=180),
+        published_at, updated_at, to_optional_datetime(flat, "dates.expires_at")
+    )
+
+def insert_bulk_listings(listings, errors) -> Dict[str, Any]:
+    started_at = time.perf_counter()
+    current_time = datetime.now().isoformat(sep=" ")
+    
+    conn = sqlite3.connect(DATABASE_NAME)
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT MAX(published_at) FROM properties")
+    latest_published_at = cursor.fetchone()[0]
+    earliest_published_at = None
+    if latest_published_at is not None:
+        earliest_published_at = (
+            datetime.fromisoformat(latest_published_at).replace(microsecond=0) + timedelta(seconds=1)
+        ).isoformat(sep=" ")
+    
+    rows = []
+    rejected = list(errors)
+    batch_state = {"refreshed": False}
+    for index, listing in listings:
+        try:
+            rows.append(build_bulk_property_row(cursor, listing, current_time, batch_state, earliest_published_at))
+        except ValueError as e:
+            rejected.append({"index": index, "error": str(e)})
+    
+    inserted_ids = []
+    if rows:
+        # Holding the write lock keeps AUTOINCREMENT ids contiguous for this batch.
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute("SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'properties'), 0)")
+            last_id_before = cursor.fetchone()[0]
+            
+            cursor.executemany(INSERT_PROPERTY_SQL, rows)
+            
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'properties'")
+            last_id_after = cursor.fetchone()[0]
+            inserted_ids = list(range(last_id_before + 1, last_id_after + 1))
+            
+            refresh_property_documents(cursor, inserted_ids)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    else:
+        conn.close()
+    
+    elapsed_seconds = time.perf_counter() - started_at
+    rejected.sort(key=lambda rejection: rejection["index"])
+    
+    return {
+        "received": len(listings) + len(errors),
+        "inserted": len(inserted_ids),
+        "rejected": len(rejected),
+        "first_id": inserted_ids[0] if inserted_ids else None,
+        "last_id": inserted_ids[-1] if inserted_ids else None,
+        "elapsed_seconds": round(elapsed_seconds, 4),
+        "rows_per_second": round(len(inserted_ids) / elapsed_seconds, 1) if elapsed_seconds > 0 else None,
+        "errors": rejected
+    }
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_database()
     yield
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(
+    CompressionMiddleware,
+    encodings=RESPONSE_COMPRESSION_ENCODINGS,
+    minimum_size=RESPONSE_COMPRESSION_MINIMUM_SIZE,
+    gzip_level=RESPONSE_COMPRESSION_GZIP_LEVEL,
+    zstd_level=RESPONSE_COMPRESSION_ZSTD_LEVEL
+)
 
 @app.get("/")
 async def root():
@@ -624,10 +1429,111 @@ async def create_new_houses():
       
       
   
+@app.post("/houses/bulk")
+async def bulk_create_houses(request: Request):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    body = await request.body()
+    
+    try:
+        listings, errors = parse_bulk_listings(body, content_type)
+        result = insert_bulk_listings(listings, errors)
+        
+        return {
+            "message": "Bulk load completed" if not result["rejected"] else "Bulk load completed with rejected rows",
+            **result
+        }
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading properties: {str(e)}")
+
+@app.get("/houses/near")
+async def get_houses_near(
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    radius_km: Optional[float] = None,
+    min_latitude: Optional[float] = None,
+    max_latitude: Optional[float] = None,
+    min_longitude: Optional[float] = None,
+    max_longitude: Optional[float] = None,
+    limit: int = 100
+):
+    try:
+        properties = get_properties_near(
+            latitude=latitude,
+            longitude=longitude,
+            radius_km=radius_km,
+            min_latitude=min_latitude,
+            max_latitude=max_latitude,
+            min_longitude=min_longitude,
+            max_longitude=max_longitude,
+            limit=limit
+        )
+        
+        return {
+            "message": "Properties retrieved successfully" if properties else "No properties found in the specified area",
+            "center": {
+                "latitude": latitude,
+                "longitude": longitude,
+                "radius_km": radius_km
+            },
+            "total_properties": len(properties),
+            "properties": properties
+        }
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving properties: {str(e)}")
+
+@app.get("/houses/search")
+async def search_houses(q: str, limit: int = 20, offset: int = 0):
+    try:
+        total_matches, properties = search_properties(q, limit=limit, offset=offset)
+        
+        return build_properties_response({
+            "message": "Properties retrieved successfully" if properties else "No properties matched the search query",
+            "query": q,
+            "total_matches": total_matches,
+            "limit": limit,
+            "offset": offset,
+            "total_properties": len(properties)
+        }, properties)
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching properties: {str(e)}")
+
 @app.get("/houses/{from_date}/{to_date}")
-async def get_houses_by_date_range(from_date: str, to_date: str):
+async def get_houses_by_date_range(
+    from_date: str,
+    to_date: str,
+    country: Optional[str] = None,
+    state: Optional[str] = None,
+    city: Optional[str] = None,
+    property_type: Optional[str] = None,
+    status: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_area: Optional[float] = None,
+    max_area: Optional[float] = None
+):
     try:
-        properties = get_properties_by_date_range(from_date, to_date)
+        properties = get_properties_by_date_range(
+            from_date,
+            to_date,
+            country=country,
+            state=state,
+            city=city,
+            property_type=property_type,
+            status=status,
+            min_price=min_price,
+            max_price=max_price,
+            min_area=min_area,
+            max_area=max_area
+        )
         
         if not properties:
             return {
@@ -640,15 +1546,14 @@ async def get_houses_by_date_range(from_date: str, to_date: str):
                 "properties": []
             }
         
-        return {
+        return build_properties_response({
             "message": "Properties retrieved successfully",
             "date_range": {
                 "from": from_date,
                 "to": to_date
             },
-            "total_properties": len(properties),
-            "properties": properties
-        }
+            "total_properties": len(properties)
+        }, properties)
         
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,35 +1,184 @@
+import argparse
+import gzip
 import requests
-import pandas as pd
-from deltalake import DeltaTable, write_deltalake
 from datetime import datetime, timedelta
 import os
 import json
 from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+from table_lock import table_lock
+
+# pandas, pyarrow and deltalake are imported inside the functions that use them,
+# so a one-shot run with nothing new to load starts without them.
+if TYPE_CHECKING:
+    import pyarrow as pa
 
 
 API_BASE_URL = "http://localhost:8000"
 BRONZE_PATH = str(Path("../datalake/bronze/realestateapi/").resolve())
+LANDING_PATH = str(Path("../datalake/landing/realestateapi/").resolve())
+LANDING_COMPRESSION = "zstd"
+API_ACCEPT_ENCODING = "zstd, gzip"
+
+
+_http_session = None
 
 
-def extract_properties_from_api(from_date: str, to_date: str):
-    url = f"{API_BASE_URL}/houses/{from_date}/{to_date}"
+class BronzeBatch(NamedTuple):
+    table: "pa.Table"
+    version: int
+    previous_max_published_at: Optional[datetime]
 
-    response = requests.get(url)
+
+def extract_properties_from_api(from_date: str, to_date: str, land_raw: bool = False,
+                                api_base_url: str = API_BASE_URL, api_params: dict = None,
+                                landing_path: str = LANDING_PATH):
+    url = f"{api_base_url}/houses/{from_date}/{to_date}"
+
+    response = get_http_session().get(
+        url, params=api_params, headers={"Accept-Encoding": API_ACCEPT_ENCODING}, stream=True
+    )
     response.raise_for_status()
 
-    data = response.json()
-    return data.get('properties', [])
+    content_encoding = response.headers.get("Content-Encoding", "identity")
+    raw_content = response.raw.read(decode_content=False)
+    content = decode_response_content(raw_content, content_encoding)
+    print(f"Received {len(raw_content)} bytes ({content_encoding}), {len(content)} bytes decoded")
+
+    data = json.loads(content)
+    properties = data.get('properties', [])
+
+    if land_raw and properties:
+        landing_file = persist_raw_response(content, landing_path=landing_path)
+        print(f"Persisted raw response to {landing_file}")
+
+    return properties
+
+
+def get_http_session():
+    global _http_session
+
+    # One session per process keeps connections to the API open between runs.
+    if _http_session is None:
+        _http_session = requests.Session()
+    return _http_session
+
+
+def decode_response_content(raw_content: bytes, content_encoding: str):
+    content_encoding = content_encoding.strip().lower()
+
+    if content_encoding in ("", "identity"):
+        return raw_content
+    if content_encoding == "gzip":
+        return gzip.decompress(raw_content)
+    if content_encoding == "zstd":
+        import zstandard
+
+        # Streamed responses carry no content size in the frame header.
+        return zstandard.ZstdDecompressor().decompressobj().decompress(raw_content)
+
+    raise ValueError(f"Unsupported Content-Encoding: {content_encoding}")
+
+
+def persist_raw_response(content: bytes, extracted_at: datetime = None, landing_path: str = LANDING_PATH):
+    import pyarrow as pa
+
+    extracted_at = extracted_at or datetime.now()
+    landing_dir = Path(landing_path) / f"extracted_date={extracted_at.date().isoformat()}"
+    landing_dir.mkdir(parents=True, exist_ok=True)
+
+    landing_file = landing_dir / f"response_{extracted_at.strftime('%Y%m%dT%H%M%S%f')}.json.zst"
+    tmp_file = landing_file.with_suffix(".tmp")
+
+    # Write then rename so a replay never picks up a partially written file.
+    with pa.output_stream(str(tmp_file), compression=LANDING_COMPRESSION) as out:
+        out.write(content)
+    os.replace(tmp_file, landing_file)
+
+    return str(landing_file)
+
 
+def list_landing_files(landing_path=LANDING_PATH):
+    return sorted(str(path) for path in Path(landing_path).glob("extracted_date=*/*.json.zst"))
 
-def get_max_published_date_from_bronze():
+
+def read_landing_file(landing_file: str):
+    import pandas as pd
+    import pyarrow as pa
+
+    with pa.input_stream(landing_file, compression=LANDING_COMPRESSION) as stream:
+        data = json.loads(stream.read())
+
+    properties = data.get('properties', [])
+    if not properties:
+        return None
+
+    # Each worker returns a typed Arrow table, so the parent only concatenates buffers
+    # instead of unpickling and converting every record on one thread.
+    df = pd.DataFrame(flatten_property_data(properties))
+    df = ensure_schema_consistency(df)
+    df = create_partition_column(df)
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def get_high_water_mark_path(bronze_path):
+    bronze_path = Path(bronze_path)
+    return bronze_path.parent / f".{bronze_path.name}.high_water_mark.json"
+
+
+def read_cached_high_water_mark(bronze_path):
     try:
-        dt = DeltaTable(BRONZE_PATH)
-        df = dt.to_pandas()
+        with open(get_high_water_mark_path(bronze_path)) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    # The cached value only holds while the table is still at the version it was written for.
+    log_dir = Path(bronze_path) / "_delta_log"
+    version = state["version"]
+    if not (log_dir / f"{version:020d}.json").exists() or (log_dir / f"{version + 1:020d}.json").exists():
+        return None
+
+    return state["max_published_at"]
+
+
+def write_cached_high_water_mark(bronze_path, version, max_published_at):
+    path = get_high_water_mark_path(bronze_path)
+    tmp_path = path.with_suffix(".tmp")
+
+    with open(tmp_path, "w") as f:
+        json.dump({"version": version, "max_published_at": max_published_at}, f)
+    os.replace(tmp_path, path)
+
+
+def get_max_published_date_from_bronze(bronze_path=BRONZE_PATH):
+    max_date_str = read_cached_high_water_mark(bronze_path)
+    if max_date_str is not None:
+        return datetime.fromisoformat(max_date_str) + timedelta(seconds=1)
+
+    try:
+        import pyarrow.compute as pc
+        from table_cache import get_table
+
+        dt = get_table(bronze_path)
+        actions = dt.get_add_actions(flatten=True)
+
+        if actions.num_rows == 0:
+            return None
+
+        # File statistics answer this without reading any data files.
+        stats_column = "max.dates.published_at"
+        if stats_column in actions.column_names and actions[stats_column].null_count == 0:
+            max_date_str = pc.max(actions[stats_column]).as_py()
+        else:
+            max_date_str = pc.max(dt.to_pyarrow_table(columns=["dates.published_at"])["dates.published_at"]).as_py()
 
-        if df.empty:
+        if max_date_str is None:
             return None
 
-        max_date_str = df['dates.published_at'].max()
+        write_cached_high_water_mark(bronze_path, dt.version(), max_date_str)
+
         max_date = datetime.fromisoformat(max_date_str) + timedelta(seconds=1)
         return max_date
 
@@ -86,11 +235,15 @@ def flatten_property_data(properties):
 
 
 def create_partition_column(df):
+    import pandas as pd
+
     df['published_date'] = pd.to_datetime(df['dates.published_at'], format='mixed').dt.date
     return df
 
 
 def ensure_schema_consistency(df):
+    import pandas as pd
+
     numeric_columns = [
         'features.floor_number',
         'location.coordinates.latitude',
@@ -103,31 +256,173 @@ def ensure_schema_consistency(df):
         'features.lot_area_sqm'
     ]
 
+    # Counts and years the API may leave empty (bulk loads). Nullable Int64 keeps them
+    # int64 in the table instead of turning into float64 when a batch holds a null.
+    integer_columns = [
+        'features.bedrooms',
+        'features.bathrooms',
+        'features.half_bathrooms',
+        'features.construction_year',
+        'features.floors',
+        'features.parking_spaces'
+    ]
+
+    # Values that are present but cannot be parsed are coerced to null; the columns
+    # they came from are kept so silver can quarantine the row instead of treating
+    # the value as missing.
+    unparsed = pd.DataFrame(index=df.index)
+
     for col in numeric_columns:
         if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+            coerced = pd.to_numeric(df[col], errors='coerce')
+            unparsed[col] = df[col].notna() & coerced.isna()
+            df[col] = coerced.astype('float64')
+
+    for col in integer_columns:
+        if col in df.columns:
+            coerced = pd.to_numeric(df[col], errors='coerce')
+            # Fractional or infinite values cannot be cast to Int64 and count as unparsed.
+            non_integral = coerced.notna() & (coerced % 1 != 0)
+            coerced = coerced.where(~non_integral)
+            unparsed[col] = df[col].notna() & coerced.isna()
+            df[col] = coerced.astype('Int64')
+
+    coercion_failures = pd.Series(pd.NA, index=df.index, dtype='string')
+    failed_rows = unparsed.any(axis=1)
+    if failed_rows.any():
+        coercion_failures[failed_rows] = [
+            ",".join(unparsed.columns[row]) for row in unparsed[failed_rows].to_numpy()
+        ]
+    df['quality.coercion_failures'] = coercion_failures
 
     return df
 
 
-def load_to_bronze():
-    Path(BRONZE_PATH).parent.mkdir(parents=True, exist_ok=True)
+def ensure_bronze_schema(dt, table, bronze_path=BRONZE_PATH, partition_by=("published_date",), parquet_options=None):
+    import pyarrow as pa
+    from deltalake import write_deltalake
+    from parquet_options import get_parquet_options, get_write_options
+    from table_cache import get_table
+
+    schema = dt.schema().to_pyarrow()
+    missing_columns = [
+        field for field in table.schema
+        if field.name not in schema.names and not pa.types.is_null(field.type)
+    ]
 
-    bronze_exists = os.path.exists(BRONZE_PATH) and os.path.isdir(BRONZE_PATH)
+    if not missing_columns:
+        return dt
+
+    print(f"Migrating bronze table to add columns: {sorted(field.name for field in missing_columns)}")
+
+    existing = dt.to_pyarrow_table()
+    for field in missing_columns:
+        existing = existing.append_column(field, pa.nulls(existing.num_rows, field.type))
+
+    write_deltalake(
+        dt,
+        existing,
+        mode="overwrite",
+        overwrite_schema=True,
+        partition_by=list(partition_by),
+        **get_write_options(parquet_options or get_parquet_options("bronze"))
+    )
+
+    return get_table(bronze_path)
+
+
+def get_replay_key(df):
+    import pandas as pd
+
+    return pd.MultiIndex.from_arrays([
+        df['id'].astype('int64'),
+        pd.to_datetime(df['dates.published_at'], format='mixed')
+    ])
+
+
+def count_rows_missing_from_replay(bronze_path, df):
+    from table_cache import get_table
 
     try:
-        dt = DeltaTable(BRONZE_PATH)
-        bronze_exists = True
+        dt = get_table(bronze_path)
     except Exception:
-        bronze_exists = False
+        return 0
 
-    if bronze_exists:
-        max_date = get_max_published_date_from_bronze()
+    df_existing = dt.to_pyarrow_dataset().to_table(columns=['id', 'dates.published_at']).to_pandas()
+    if df_existing.empty:
+        return 0
+    return int((~get_replay_key(df_existing).isin(get_replay_key(df))).sum())
 
-        if max_date:
-            from_date = (max_date).strftime("%Y-%m-%dT%H:%M:%S")
-        else:
-            from_date = "1990-01-01"
+
+def replay_bronze_from_landing(max_workers=None, landing_path=LANDING_PATH, bronze_path=BRONZE_PATH,
+                               partition_by=("published_date",), parquet_options=None, force=False):
+    import pyarrow as pa
+    from concurrent.futures import ProcessPoolExecutor
+    from deltalake import write_deltalake
+    from parquet_options import get_parquet_options, get_write_options
+
+    landing_files = list_landing_files(landing_path)
+
+    if not landing_files:
+        print(f"No landing files found in {landing_path}")
+        return False
+
+    print(f"Replaying {len(landing_files)} landing files into bronze layer")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        tables = [table for table in executor.map(read_landing_file, landing_files) if table is not None]
+
+    if not tables:
+        print("No properties found in landing files")
+        return False
+
+    # Columns that are empty in a whole file are inferred as null and promoted here.
+    table = pa.concat_tables(tables, promote_options="default")
+
+    # Keep the last landed version of each (id, published_at), in landing order.
+    table = table.append_column("replay_row", pa.array(range(table.num_rows), type=pa.int64()))
+    last_rows = table.group_by(['id', 'dates.published_at']).aggregate([("replay_row", "max")])
+    table = table.take(last_rows.sort_by("replay_row_max")["replay_row_max"]).drop(["replay_row"])
+
+    with table_lock(bronze_path):
+        # Landing only holds runs made with --land-raw, so older history may exist
+        # only in bronze and would be lost by the overwrite.
+        missing = count_rows_missing_from_replay(
+            bronze_path, table.select(['id', 'dates.published_at']).to_pandas()
+        )
+        if missing:
+            if not force:
+                print(f"Aborting replay: {missing} bronze rows are not covered by the landing files "
+                      f"(use --force to drop them)")
+                return False
+            print(f"Dropping {missing} bronze rows not covered by the landing files")
+
+        write_deltalake(
+            bronze_path,
+            table,
+            mode="overwrite",
+            overwrite_schema=True,
+            partition_by=list(partition_by),
+            **get_write_options(parquet_options or get_parquet_options("bronze"))
+        )
+
+    print(f"Successfully rebuilt bronze layer with {table.num_rows} properties from landing files")
+    return True
+
+
+def load_to_bronze(land_raw: bool = False, api_base_url: str = API_BASE_URL, api_params: dict = None,
+                   bronze_path: str = BRONZE_PATH, landing_path: str = LANDING_PATH,
+                   partition_by=("published_date",), parquet_options: dict = None):
+    Path(bronze_path).parent.mkdir(parents=True, exist_ok=True)
+
+    previous_max_published_at = None
+
+    # Returns None when the table does not exist yet or is empty.
+    max_date = get_max_published_date_from_bronze(bronze_path)
+
+    if max_date:
+        from_date = (max_date).strftime("%Y-%m-%dT%H:%M:%S")
+        previous_max_published_at = max_date - timedelta(seconds=1)
     else:
         from_date = "1990-01-01"
 
@@ -135,29 +430,75 @@ def load_to_bronze():
 
     print(f"Extracting properties from {from_date} to {to_date}")
 
-    properties = extract_properties_from_api(from_date, to_date)
+    properties = extract_properties_from_api(
+        from_date, to_date, land_raw=land_raw, api_base_url=api_base_url, api_params=api_params,
+        landing_path=landing_path
+    )
 
     if not properties:
         print("No new properties to load")
-        return False
+        return None
 
     print(f"Extracted {len(properties)} properties")
 
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from deltalake import write_deltalake
+    from parquet_options import get_parquet_options, get_write_options
+    from table_cache import get_table
+
     flattened_properties = flatten_property_data(properties)
     df = pd.DataFrame(flattened_properties)
 
     df = ensure_schema_consistency(df)
     df = create_partition_column(df)
-
-    write_deltalake(
-        BRONZE_PATH,
-        df,
-        mode="append",
-        partition_by=["published_date"]
-    )
-
-    print(f"Successfully loaded {len(df)} properties to bronze layer")
-    return True
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    with table_lock(bronze_path):
+        try:
+            dt = get_table(bronze_path)
+        except Exception:
+            dt = None
+
+        if dt is not None:
+            dt = ensure_bronze_schema(dt, table, bronze_path, partition_by, parquet_options)
+
+            # Columns that are empty in the whole batch are inferred as null; give them
+            # the table's types so the append matches its schema.
+            schema = dt.schema().to_pyarrow()
+            if sorted(table.column_names) == sorted(schema.names):
+                table = table.select(schema.names).cast(schema)
+
+        # Writing through the cached table skips reloading its log.
+        write_deltalake(
+            dt if dt is not None else bronze_path,
+            table,
+            mode="append",
+            partition_by=list(partition_by),
+            **get_write_options(parquet_options or get_parquet_options("bronze"))
+        )
+        dt = get_table(bronze_path)
+        version = dt.version()
+
+        # Only listings published after the previous high-water mark were requested.
+        high_water_mark = pc.max(table["dates.published_at"]).as_py()
+        if high_water_mark is not None:
+            write_cached_high_water_mark(bronze_path, version, high_water_mark)
+
+    print(f"Successfully loaded {len(df)} properties to bronze layer (version {version})")
+    return BronzeBatch(table, version, previous_max_published_at)
 
 if __name__ == "__main__":
-    load_to_bronze()
+    parser = argparse.ArgumentParser(description="Load API data into the bronze layer")
+    parser.add_argument("--land-raw", action="store_true", help="Persist raw API responses to the landing zone")
+    parser.add_argument("--replay", action="store_true", help="Rebuild bronze from the landing zone without calling the API")
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes used by --replay")
+    parser.add_argument("--force", action="store_true",
+                        help="Let --replay drop bronze rows that are not in the landing files")
+    args = parser.parse_args()
+
+    if args.replay:
+        replay_bronze_from_landing(max_workers=args.workers, force=args.force)
+    else:
+        load_to_bronze(land_raw=args.land_raw)
@@ -0,0 +1,155 @@
+from deltalake import DeltaTable, write_deltalake
+from datetime import datetime
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from table_lock import table_lock
+
+
+QUARANTINE_PATH = str(Path("../datalake/quarantine/realestateapi/").resolve())
+
+AREA_ABSOLUTE_TOLERANCE = 0.05
+AREA_RELATIVE_TOLERANCE = 0.005
+PRICE_PER_SQM_RELATIVE_TOLERANCE = 0.01
+
+# Numeric columns bronze could not parse, comma-separated; only present while validating.
+COERCION_FAILURES_COLUMN = "quality_coercion_failures"
+
+# The same list in the quarantine table, since bronze has already nulled the raw values.
+QUARANTINE_COERCION_FAILURES_COLUMN = "coercion_failures"
+
+
+def null_keys(table):
+    return pc.or_kleene(pc.is_null(table["id"]), pc.is_null(table["published_at"]))
+
+
+def missing_price(table):
+    return pc.is_null(table["pricing_price"])
+
+
+def unparseable_number(table):
+    # Bronze turns values it cannot parse into nulls, which the other rules treat as missing.
+    return pc.is_valid(table[COERCION_FAILURES_COLUMN])
+
+
+def coordinates_out_of_bounds(table):
+    latitude = table["location_coordinates_latitude"]
+    longitude = table["location_coordinates_longitude"]
+    return pc.or_kleene(
+        pc.or_kleene(pc.less(latitude, -90.0), pc.greater(latitude, 90.0)),
+        pc.or_kleene(pc.less(longitude, -180.0), pc.greater(longitude, 180.0))
+    )
+
+
+def area_inconsistent(table):
+    total = table["features_total_area_sqm"]
+    parts = pc.add(table["features_covered_area_sqm"], table["features_uncovered_area_sqm"])
+    tolerance = pc.max_element_wise(AREA_ABSOLUTE_TOLERANCE, pc.multiply(pc.abs(total), AREA_RELATIVE_TOLERANCE))
+    return pc.greater(pc.abs(pc.subtract(parts, total)), tolerance)
+
+
+def price_per_sqm_inconsistent(table):
+    total = table["features_total_area_sqm"]
+    price_per_sqm = table["pricing_price_per_sqm"]
+    # Null where total area is missing or zero, so those rows are not judged by this rule.
+    positive_total = pc.if_else(pc.greater(total, 0.0), total, pa.scalar(None, pa.float64()))
+    expected = pc.divide(table["pricing_price"], positive_total)
+    tolerance = pc.multiply(pc.abs(expected), PRICE_PER_SQM_RELATIVE_TOLERANCE)
+    return pc.greater(pc.abs(pc.subtract(price_per_sqm, expected)), tolerance)
+
+
+def timestamps_out_of_order(table):
+    published_at = table["published_at"]
+    return pc.or_kleene(
+        pc.greater(published_at, table["updated_at"]),
+        pc.greater(published_at, table["expires_at"])
+    )
+
+
+RULES = [
+    ("null_keys", null_keys),
+    ("missing_price", missing_price),
+    ("unparseable_number", unparseable_number),
+    ("coordinates_out_of_bounds", coordinates_out_of_bounds),
+    ("area_inconsistent", area_inconsistent),
+    ("price_per_sqm_inconsistent", price_per_sqm_inconsistent),
+    ("timestamps_out_of_order", timestamps_out_of_order)
+]
+
+
+def validate_batch(table, coercion_failures=None):
+    if coercion_failures is None:
+        coercion_failures = pa.nulls(table.num_rows, pa.string())
+    table = table.append_column(COERCION_FAILURES_COLUMN, pa.array(coercion_failures, type=pa.string()))
+
+    # A rule yields null when an input is missing; missing optional values do not fail a row.
+    failures = [(name, rule(table).fill_null(False)) for name, rule in RULES]
+
+    failed = failures[0][1]
+    for _, rule_failed in failures[1:]:
+        failed = pc.or_kleene(failed, rule_failed)
+
+    passed = pc.invert(failed)
+
+    if not pc.any(failed).as_py():
+        return passed, None
+
+    # Labels are only built for the quarantined rows, which are expected to be few.
+    failed_by_rule = [(name, rule_failed.filter(failed).to_numpy()) for name, rule_failed in failures]
+    failed_rules = pa.array([
+        ",".join(name for name, rule_failed in failed_by_rule if rule_failed[row])
+        for row in range(len(failed_by_rule[0][1]))
+    ], type=pa.string())
+
+    quarantined = table.filter(failed)
+    quarantined = quarantined.rename_columns([
+        QUARANTINE_COERCION_FAILURES_COLUMN if name == COERCION_FAILURES_COLUMN else name
+        for name in quarantined.column_names
+    ])
+    quarantined = quarantined.append_column("failed_rules", failed_rules)
+    quarantined = quarantined.append_column(
+        "quarantined_at",
+        pa.array([datetime.now()] * quarantined.num_rows, type=pa.timestamp('us'))
+    )
+
+    return passed, quarantined
+
+
+def ensure_quarantine_schema(quarantine_path, quarantined):
+    if not (Path(quarantine_path) / "_delta_log").exists():
+        return
+
+    dt = DeltaTable(quarantine_path)
+    schema = dt.schema().to_pyarrow()
+    missing_columns = [field for field in quarantined.schema if field.name not in schema.names]
+
+    if not missing_columns:
+        return
+
+    print(f"Migrating quarantine table to add columns: {sorted(field.name for field in missing_columns)}")
+
+    existing = dt.to_pyarrow_table()
+    for field in missing_columns:
+        existing = existing.append_column(field, pa.nulls(existing.num_rows, field.type))
+
+    write_deltalake(
+        dt,
+        existing,
+        mode="overwrite",
+        overwrite_schema=True
+    )
+
+
+def write_quarantine(quarantined, quarantine_path=QUARANTINE_PATH):
+    Path(quarantine_path).parent.mkdir(parents=True, exist_ok=True)
+
+    with table_lock(quarantine_path):
+        ensure_quarantine_schema(quarantine_path, quarantined)
+        write_deltalake(
+            quarantine_path,
+            quarantined,
+            mode="append"
+        )
+
+    print(f"Quarantined {quarantined.num_rows} records to {quarantine_path}")
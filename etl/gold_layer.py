@@ -0,0 +1,220 @@
+import json
+import os
+import pandas as pd
+from deltalake import write_deltalake
+from pathlib import Path
+import pyarrow as pa
+
+from table_cache import get_table
+from table_lock import table_lock
+
+
+SILVER_PATH = str(Path("../datalake/silver/realestateapi/").resolve())
+GOLD_PATH = str(Path("../datalake/gold/realestateapi_aggregates/").resolve())
+
+GROUP_COLUMNS = ["location_country", "location_city", "property_type", "published_month"]
+SILVER_COLUMNS = ["location_country", "location_city", "property_type", "published_at",
+                  "pricing_price", "pricing_price_per_sqm"]
+
+
+def get_schema():
+    return pa.schema([
+        pa.field("location_country", pa.string()),
+        pa.field("location_city", pa.string()),
+        pa.field("property_type", pa.string()),
+        pa.field("published_month", pa.date32()),
+        pa.field("listing_count", pa.int64()),
+        pa.field("price_sum", pa.float64()),
+        pa.field("price_per_sqm_sum", pa.float64()),
+        pa.field("price_per_sqm_count", pa.int64()),
+        pa.field("avg_price", pa.float64()),
+        pa.field("avg_price_per_sqm", pa.float64())
+    ])
+
+
+def compute_aggregate_state(df, sign=1):
+    # Sums and counts are the mergeable state; averages are derived from them.
+    df_state = pd.DataFrame({
+        "location_country": df["location_country"].fillna(""),
+        "location_city": df["location_city"].fillna(""),
+        "property_type": df["property_type"].fillna(""),
+        "published_month": pd.to_datetime(df["published_at"]).dt.to_period("M").dt.start_time.dt.date,
+        "listing_count": 1,
+        "price_sum": df["pricing_price"].fillna(0.0),
+        "price_per_sqm_sum": df["pricing_price_per_sqm"].fillna(0.0),
+        "price_per_sqm_count": df["pricing_price_per_sqm"].notna().astype("int64")
+    })
+
+    df_state = df_state.groupby(GROUP_COLUMNS, as_index=False).sum()
+
+    for col in ["listing_count", "price_sum", "price_per_sqm_sum", "price_per_sqm_count"]:
+        df_state[col] = df_state[col] * sign
+
+    return df_state
+
+
+def combine_aggregate_states(states):
+    df_state = pd.concat(states, ignore_index=True)
+    df_state = df_state.groupby(GROUP_COLUMNS, as_index=False).sum()
+
+    df_state["avg_price"] = (df_state["price_sum"] / df_state["listing_count"]).where(df_state["listing_count"] > 0)
+    df_state["avg_price_per_sqm"] = (
+        df_state["price_per_sqm_sum"] / df_state["price_per_sqm_count"]
+    ).where(df_state["price_per_sqm_count"] > 0)
+
+    return df_state
+
+
+def get_gold_state_path(gold_path):
+    gold_path = Path(gold_path)
+    return gold_path.parent / f".{gold_path.name}.silver_version.json"
+
+
+def read_gold_state(gold_path):
+    try:
+        with open(get_gold_state_path(gold_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_gold_state(gold_path, silver_version, gold_version):
+    path = get_gold_state_path(gold_path)
+    tmp_path = path.with_suffix(".tmp")
+
+    with open(tmp_path, "w") as f:
+        json.dump({"silver_version": silver_version, "gold_version": gold_version}, f)
+    os.replace(tmp_path, path)
+
+
+def is_delta_in_step(dt_gold, gold_path, silver_version, silver_versions):
+    # silver_versions lists (version before, version after) for each silver commit in
+    # the delta. It only applies if those commits lead from the silver version gold
+    # was last built from to the current one, with no commit missing in between.
+    state = read_gold_state(gold_path)
+    if state is None or state["gold_version"] != dt_gold.version():
+        return False
+
+    version = state["silver_version"]
+    for base_version, commit_version in sorted(silver_versions or []):
+        if base_version != version:
+            return False
+        version = commit_version
+    return version == silver_version
+
+
+def carry_gold_state(gold_path, silver_version, new_silver_version):
+    # For silver commits that do not change any rows (compaction), so gold stays in
+    # step instead of being rebuilt on the next run.
+    with table_lock(gold_path):
+        state = read_gold_state(gold_path)
+        if state is None or state["silver_version"] != silver_version:
+            return
+
+        try:
+            dt_gold = get_table(gold_path)
+        except Exception:
+            return
+
+        if state["gold_version"] == dt_gold.version():
+            write_gold_state(gold_path, new_silver_version, dt_gold.version())
+
+
+def load_to_gold(df_merged=None, df_replaced=None, silver_path=SILVER_PATH, gold_path=GOLD_PATH,
+                 silver_versions=None):
+    Path(gold_path).parent.mkdir(parents=True, exist_ok=True)
+
+    with table_lock(gold_path):
+        merge_into_gold(df_merged, df_replaced, silver_path, gold_path, silver_versions)
+
+
+def rebuild_gold(silver_path, gold_path):
+    try:
+        dt_silver = get_table(silver_path)
+    except Exception:
+        print("No data in silver layer")
+        return
+
+    silver_version = dt_silver.version()
+    df_silver = dt_silver.to_pandas(columns=SILVER_COLUMNS)
+
+    if df_silver.empty:
+        print("No data in silver layer")
+        return
+
+    df_gold = combine_aggregate_states([compute_aggregate_state(df_silver)])
+    write_deltalake(
+        gold_path,
+        pa.Table.from_pandas(df_gold, schema=get_schema(), preserve_index=False),
+        mode="overwrite"
+    )
+    write_gold_state(gold_path, silver_version, get_table(gold_path).version())
+    print(f"Successfully built gold table with {len(df_gold)} aggregate rows from silver version {silver_version}")
+
+
+def merge_into_gold(df_merged, df_replaced, silver_path, gold_path, silver_versions=None):
+    try:
+        dt_gold = get_table(gold_path)
+    except Exception:
+        print("Gold table does not exist. Building aggregates from full silver table")
+        rebuild_gold(silver_path, gold_path)
+        return
+
+    try:
+        silver_version = get_table(silver_path).version()
+    except Exception:
+        print("No data in silver layer")
+        return
+
+    if not is_delta_in_step(dt_gold, gold_path, silver_version, silver_versions):
+        # A previous gold run failed or was skipped after silver committed, so a delta
+        # would miss rows; the aggregates are rebuilt from silver instead.
+        print("Gold is not in step with silver. Rebuilding aggregates from full silver table")
+        rebuild_gold(silver_path, gold_path)
+        return
+
+    if df_merged is None or df_merged.empty:
+        print("No new silver records to aggregate")
+        write_gold_state(gold_path, silver_version, dt_gold.version())
+        return
+
+    states = [compute_aggregate_state(df_merged)]
+    if df_replaced is not None and not df_replaced.empty:
+        # Retract the previous version of updated rows so sums stay exact.
+        states.append(compute_aggregate_state(df_replaced, sign=-1))
+
+    df_delta = combine_aggregate_states(states)
+    source_table = pa.Table.from_pandas(df_delta, schema=get_schema(), preserve_index=False)
+
+    print(f"Merging {len(df_delta)} aggregate rows into gold table")
+
+    (
+        dt_gold.merge(
+            source=source_table,
+            predicate=" AND ".join(f"target.{col} = source.{col}" for col in GROUP_COLUMNS),
+            source_alias="source",
+            target_alias="target"
+        )
+        .when_matched_update({
+            "listing_count": "target.listing_count + source.listing_count",
+            "price_sum": "target.price_sum + source.price_sum",
+            "price_per_sqm_sum": "target.price_per_sqm_sum + source.price_per_sqm_sum",
+            "price_per_sqm_count": "target.price_per_sqm_count + source.price_per_sqm_count",
+            "avg_price": "CASE WHEN target.listing_count + source.listing_count > 0 "
+                         "THEN (target.price_sum + source.price_sum) / (target.listing_count + source.listing_count) "
+                         "ELSE NULL END",
+            "avg_price_per_sqm": "CASE WHEN target.price_per_sqm_count + source.price_per_sqm_count > 0 "
+                                 "THEN (target.price_per_sqm_sum + source.price_per_sqm_sum) "
+                                 "/ (target.price_per_sqm_count + source.price_per_sqm_count) "
+                                 "ELSE NULL END"
+        })
+        .when_not_matched_insert_all()
+        .execute()
+    )
+    write_gold_state(gold_path, silver_version, dt_gold.version())
+
+    print(f"Successfully merged {len(df_delta)} aggregate rows into gold table")
+
+
+if __name__ == "__main__":
+    load_to_gold()
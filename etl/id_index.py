@@ -0,0 +1,114 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+
+
+ID_INDEX_COMPRESSION = "zstd"
+
+
+def get_id_index_path(table_path):
+    table_path = Path(table_path)
+    return table_path.parent / f".{table_path.name}.id_index.arrow"
+
+
+def build_id_index(dt):
+    partition_columns = dt.metadata().partition_columns
+    if not partition_columns:
+        return None
+
+    table = dt.to_pyarrow_dataset().to_table(columns=["id"] + partition_columns)
+    return create_id_index(table, partition_columns)
+
+
+def create_id_index(table, partition_columns):
+    return normalize_id_index(to_index_columns(table, partition_columns))
+
+
+def to_index_columns(table, partition_columns):
+    # Partition values are compared as strings, the same form Delta uses in the log.
+    columns = {"id": pc.cast(table["id"], pa.int64())}
+    for column in partition_columns:
+        columns[column] = pc.cast(table[column], pa.string())
+    return pa.table(columns)
+
+
+def normalize_id_index(table):
+    # One row per (id, partition), sorted by id, with dictionary-encoded partition values.
+    partition_columns = table.column_names[1:]
+    index = table.group_by(table.column_names).aggregate([]).sort_by("id")
+    index = index.select(["id"] + partition_columns)
+
+    for column in partition_columns:
+        position = index.column_names.index(column)
+        index = index.set_column(position, column, index[column].dictionary_encode())
+    return index.combine_chunks()
+
+
+def load_id_index(table_path, version):
+    index_path = get_id_index_path(table_path)
+    if not index_path.exists():
+        return None
+
+    with pa.memory_map(str(index_path)) as source:
+        index = ipc.open_file(source).read_all()
+
+    # The index is only trusted for the table version it was written for.
+    metadata = json.loads(index.schema.metadata[b"id_index"])
+    if metadata["version"] != version:
+        return None
+    return index
+
+
+def save_id_index(table_path, index, version):
+    index_path = get_id_index_path(table_path)
+    tmp_path = index_path.with_suffix(".tmp")
+
+    index = index.replace_schema_metadata({"id_index": json.dumps({"version": version})})
+    options = ipc.IpcWriteOptions(compression=ID_INDEX_COMPRESSION)
+    with ipc.new_file(str(tmp_path), index.schema, options=options) as writer:
+        writer.write_table(index)
+    os.replace(tmp_path, index_path)
+
+
+def update_id_index(index, added, removed=None):
+    partition_columns = index.column_names[1:]
+    index = to_index_columns(index, partition_columns)
+
+    # Only the (id, partition) pairs that were replaced are dropped; sources sharing
+    # the table under another scope partition may reuse the same ids.
+    if removed is not None and removed.num_rows > 0:
+        index = index.join(
+            to_index_columns(removed, partition_columns),
+            keys=["id"] + partition_columns,
+            join_type="left anti"
+        )
+
+    return normalize_id_index(pa.concat_tables([
+        index.select(["id"] + partition_columns),
+        to_index_columns(added, partition_columns)
+    ]))
+
+
+def lookup_partitions(index, ids):
+    index_ids = index["id"].to_numpy()
+    query = np.unique(np.asarray(ids, dtype=np.int64))
+
+    # Binary search on the sorted id array; an id can map to several partitions.
+    left = np.searchsorted(index_ids, query, side="left")
+    right = np.searchsorted(index_ids, query, side="right")
+    counts = right - left
+    if counts.sum() == 0:
+        return {column: [] for column in index.column_names[1:]}
+
+    offsets = np.repeat(left, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    matches = index.take(pa.array(offsets))
+
+    return {
+        column: sorted(pc.unique(matches[column].cast(pa.string())).to_pylist())
+        for column in index.column_names[1:]
+    }
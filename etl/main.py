@@ -1,39 +1,183 @@
+import argparse
+import signal
+import threading
+import time
+
 from bronze_layer import load_to_bronze
-from silver_layer import load_to_silver
+
+# silver_layer, gold_layer and orchestrator pull in pandas and deltalake; they are
+# imported once there is something for them to do.
 
 
-def run_etl_pipeline():
+def run_etl_pipeline(land_raw=False, silver_mode="versioned"):
     print("=" * 50)
     print("Starting ETL Pipeline")
     print("=" * 50)
 
-    print("\n[1/2] Running Bronze Layer")
+    print("\n[1/3] Running Bronze Layer")
     print("-" * 50)
     try:
-        has_new_data = load_to_bronze()
+        bronze_batch = load_to_bronze(land_raw=land_raw)
         print("Bronze layer completed successfully")
     except Exception as e:
         print(f"Error in bronze layer: {e}")
         return
 
-    if not has_new_data:
+    if bronze_batch is None:
         print("\nSkipping Silver Layer - No new data detected in Bronze")
         print("=" * 50)
         return
 
-    print("\n[2/2] Running Silver Layer")
+    from silver_layer import load_to_silver
+    from gold_layer import load_to_gold
+
+    print("\n[2/3] Running Silver Layer")
     print("-" * 50)
     try:
-        load_to_silver()
+        silver_result = load_to_silver(bronze_batch, mode=silver_mode)
         print("Silver layer completed successfully")
     except Exception as e:
         print(f"Error in silver layer: {e}")
         return
 
+    print("\n[3/3] Running Gold Layer")
+    print("-" * 50)
+    try:
+        if silver_result is None:
+            load_to_gold()
+        else:
+            load_to_gold(
+                silver_result.df_merged,
+                silver_result.df_replaced,
+                silver_versions=[(silver_result.base_version, silver_result.version)]
+            )
+        print("Gold layer completed successfully")
+    except Exception as e:
+        print(f"Error in gold layer: {e}")
+        return
+
     print("\n" + "=" * 50)
     print("ETL Pipeline completed successfully")
     print("=" * 50)
 
 
+def optimize_tables(sources_path=None):
+    from bronze_layer import BRONZE_PATH
+    from gold_layer import GOLD_PATH, carry_gold_state
+    from id_index import load_id_index, save_id_index
+    from parquet_options import compact_table, get_parquet_options
+    from silver_layer import SILVER_PATH, carry_consumed_bronze
+    from table_cache import get_table
+    from table_lock import table_lock
+
+    # Each table is listed with the tables downstream of it, whose record of the
+    # version they have consumed moves on to the compacted version.
+    tables = {BRONZE_PATH: ("bronze", None, {SILVER_PATH}), SILVER_PATH: ("silver", None, {GOLD_PATH})}
+    if sources_path:
+        from orchestrator import load_sources
+
+        sources, _ = load_sources(sources_path)
+        tables = {}
+        for source in sources:
+            tables[source["bronze_path"]] = ("bronze", source["bronze_parquet"], {source["silver_path"]})
+            silver_table = tables.setdefault(source["silver_path"], ("silver", source["silver_parquet"], set()))
+            silver_table[2].add(source["gold_path"])
+
+    for table_path, (layer, overrides, downstream_paths) in tables.items():
+        try:
+            dt = get_table(table_path)
+        except Exception:
+            print(f"Skipping {table_path}, table does not exist")
+            continue
+
+        with table_lock(table_path):
+            dt = get_table(table_path)
+            version = dt.version()
+            id_index = load_id_index(table_path, version) if layer == "silver" else None
+            compact_table(dt, get_parquet_options(layer, overrides))
+
+            if dt.version() != version:
+                for downstream_path in downstream_paths:
+                    if layer == "bronze":
+                        carry_consumed_bronze(downstream_path, table_path, version, dt.version())
+                    else:
+                        carry_gold_state(downstream_path, version, dt.version())
+
+            # Compaction moves rows between files but never between partitions.
+            if id_index is not None:
+                save_id_index(table_path, id_index, dt.version())
+
+
+def run_daemon(interval, land_raw=False, silver_mode="versioned", sources_path=None, max_workers=None):
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
+    executor = None
+    if sources_path:
+        from concurrent.futures.process import BrokenProcessPool
+        from orchestrator import create_executor, get_max_workers, load_sources, run_sources_with_executor
+
+        sources, configured_workers = load_sources(sources_path)
+        max_workers = get_max_workers(sources, configured_workers, max_workers)
+        # The pool outlives each cycle, so workers keep their imports, tables and sessions.
+        executor = create_executor(max_workers)
+
+    print(f"Starting ETL daemon, polling every {interval} seconds")
+
+    try:
+        while not stop_event.is_set():
+            started = time.monotonic()
+
+            if executor is None:
+                run_etl_pipeline(land_raw=land_raw, silver_mode=silver_mode)
+            else:
+                try:
+                    run_sources_with_executor(sources, executor, max_workers, land_raw=land_raw)
+                except BrokenProcessPool:
+                    print("Worker pool stopped unexpectedly, restarting it")
+                    executor.shutdown(wait=False)
+                    executor = create_executor(max_workers)
+
+            elapsed = time.monotonic() - started
+            print(f"Cycle finished in {elapsed:.2f} seconds")
+            stop_event.wait(max(0.0, interval - elapsed))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        print("ETL daemon stopped")
+
+
 if __name__ == "__main__":
-    run_etl_pipeline()
+    parser = argparse.ArgumentParser(description="Run the bronze, silver and gold ETL pipeline")
+    parser.add_argument("--land-raw", action="store_true", help="Persist raw API responses to the landing zone")
+    parser.add_argument("--sources", default=None, help="JSON file listing sources to run in parallel")
+    parser.add_argument("--workers", type=int, default=None, help="Maximum number of sources run at once")
+    parser.add_argument("--silver-mode", choices=["versioned", "latest"], default=None,
+                        help="Keep every published version (versioned, the default) or one row per id (latest)")
+    parser.add_argument("--optimize", action="store_true", help="Compact bronze and silver files, then exit")
+    parser.add_argument("--daemon", action="store_true", help="Keep running and poll the API every --interval seconds")
+    parser.add_argument("--interval", type=float, default=60, help="Seconds between polls in --daemon mode")
+    args = parser.parse_args()
+
+    # With --sources each source sets its own silver_mode in the sources file.
+    if args.sources and args.silver_mode:
+        parser.error("--silver-mode cannot be combined with --sources; set silver_mode in the sources file")
+    silver_mode = args.silver_mode or "versioned"
+
+    if args.optimize:
+        optimize_tables(sources_path=args.sources)
+    elif args.daemon:
+        run_daemon(
+            args.interval,
+            land_raw=args.land_raw,
+            silver_mode=silver_mode,
+            sources_path=args.sources,
+            max_workers=args.workers
+        )
+    elif args.sources:
+        from orchestrator import run_sources
+
+        run_sources(args.sources, land_raw=args.land_raw, max_workers=args.workers)
+    else:
+        run_etl_pipeline(land_raw=args.land_raw, silver_mode=silver_mode)
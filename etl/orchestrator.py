@@ -0,0 +1,247 @@
+import argparse
+import json
+import multiprocessing
+import signal
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from bronze_layer import API_BASE_URL, BRONZE_PATH, LANDING_PATH, load_to_bronze
+from data_quality import QUARANTINE_PATH
+from gold_layer import GOLD_PATH, SILVER_COLUMNS, load_to_gold
+from parquet_options import get_parquet_options
+from silver_layer import SILVER_PATH, load_to_silver
+
+
+SOURCE_DEFAULTS = {
+    "api_base_url": API_BASE_URL,
+    "api_params": None,
+    "bronze_path": BRONZE_PATH,
+    "landing_path": LANDING_PATH,
+    "silver_path": SILVER_PATH,
+    "gold_path": GOLD_PATH,
+    "quarantine_path": QUARANTINE_PATH,
+    "bronze_partition_by": ["published_date"],
+    "silver_partition_by": ["published_date"],
+    "scope": None,
+    "silver_mode": "versioned",
+    "bronze_parquet": None,
+    "silver_parquet": None,
+    "land_raw": False
+}
+
+PATH_KEYS = ["bronze_path", "landing_path", "silver_path", "gold_path", "quarantine_path"]
+
+
+def load_sources(config_path):
+    with open(config_path) as f:
+        config = json.load(f)
+
+    sources = []
+    for source_config in config.get("sources", []):
+        if "name" not in source_config:
+            raise ValueError(f"Source without a name in {config_path}")
+
+        source = {**SOURCE_DEFAULTS, **source_config}
+        for key in PATH_KEYS:
+            source[key] = str(Path(source[key]).resolve())
+        sources.append(source)
+
+    validate_sources(sources)
+    return sources, config.get("max_workers")
+
+
+def validate_sources(sources):
+    if not sources:
+        raise ValueError("No sources configured")
+
+    names = [source["name"] for source in sources]
+    if len(set(names)) != len(names):
+        raise ValueError("Source names must be unique")
+
+    # Bronze tracks a single high-water mark per table, so each source needs its own.
+    for key in ["bronze_path", "landing_path"]:
+        paths = [source[key] for source in sources]
+        if len(set(paths)) != len(paths):
+            raise ValueError(f"Sources cannot share a {key}")
+
+    silver_groups = {}
+    for source in sources:
+        silver_groups.setdefault(source["silver_path"], []).append(source)
+
+    for silver_path, group in silver_groups.items():
+        if len(group) == 1:
+            continue
+
+        # Shared silver tables need a scope per source so high-water marks and merges
+        # only see that source's rows.
+        if any(not source["scope"] for source in group):
+            raise ValueError(f"Sources sharing {silver_path} must each define a scope")
+        scopes = [json.dumps(source["scope"], sort_keys=True) for source in group]
+        if len(set(scopes)) != len(scopes):
+            raise ValueError(f"Sources sharing {silver_path} must have distinct scopes")
+        if len({tuple(source["silver_partition_by"]) for source in group}) != 1:
+            raise ValueError(f"Sources sharing {silver_path} must use the same silver_partition_by")
+        if len({source["silver_mode"] for source in group}) != 1:
+            raise ValueError(f"Sources sharing {silver_path} must use the same silver_mode")
+
+    gold_silver_paths = {}
+    for source in sources:
+        gold_silver_paths.setdefault(source["gold_path"], set()).add(source["silver_path"])
+
+    for gold_path, silver_paths in gold_silver_paths.items():
+        if len(silver_paths) != 1:
+            raise ValueError(f"Sources sharing {gold_path} must share one silver_path")
+
+
+def run_source(source, land_raw=False):
+    name = source["name"]
+
+    try:
+        print(f"[{name}] Running Bronze Layer")
+        bronze_batch = load_to_bronze(
+            land_raw=land_raw or source["land_raw"],
+            api_base_url=source["api_base_url"],
+            api_params=source["api_params"],
+            bronze_path=source["bronze_path"],
+            landing_path=source["landing_path"],
+            partition_by=source["bronze_partition_by"],
+            parquet_options=get_parquet_options("bronze", source["bronze_parquet"])
+        )
+
+        if bronze_batch is None:
+            print(f"[{name}] Skipping Silver Layer - No new data detected in Bronze")
+            return {"name": name, "status": "no_new_data"}
+
+        print(f"[{name}] Running Silver Layer")
+        silver_result = load_to_silver(
+            bronze_batch,
+            bronze_path=source["bronze_path"],
+            silver_path=source["silver_path"],
+            partition_by=source["silver_partition_by"],
+            scope=source["scope"],
+            quarantine_path=source["quarantine_path"],
+            mode=source["silver_mode"],
+            parquet_options=get_parquet_options("silver", source["silver_parquet"])
+        )
+    except Exception as e:
+        print(f"[{name}] Error: {e}")
+        return {"name": name, "status": "failed", "error": str(e)}
+
+    if silver_result is None:
+        return {"name": name, "status": "ok"}
+
+    df_replaced = silver_result.df_replaced
+
+    # Only the columns gold aggregates are sent back to the parent process, with the
+    # silver versions gold needs to check that no commit was skipped.
+    return {
+        "name": name,
+        "status": "ok",
+        "df_merged": silver_result.df_merged[SILVER_COLUMNS],
+        "df_replaced": df_replaced[SILVER_COLUMNS] if df_replaced is not None else None,
+        "silver_version": (silver_result.base_version, silver_result.version)
+    }
+
+
+def concat_frames(frames):
+    frames = [df for df in frames if df is not None and not df.empty]
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True)
+
+
+def run_gold(sources, results):
+    results_by_name = {result["name"]: result for result in results}
+
+    gold_groups = {}
+    for source in sources:
+        gold_groups.setdefault(source["gold_path"], []).append(source)
+
+    # Gold runs once per table after every source has committed to silver, so a
+    # first-time build from silver cannot double count a source merged after it.
+    for gold_path, group in gold_groups.items():
+        group_results = [results_by_name[source["name"]] for source in group]
+        if not any(result["status"] == "ok" for result in group_results):
+            continue
+
+        print(f"Running Gold Layer for {gold_path}")
+        try:
+            load_to_gold(
+                concat_frames(result.get("df_merged") for result in group_results),
+                concat_frames(result.get("df_replaced") for result in group_results),
+                silver_path=group[0]["silver_path"],
+                gold_path=gold_path,
+                silver_versions=[result["silver_version"] for result in group_results if "silver_version" in result]
+            )
+        except Exception as e:
+            print(f"Error in gold layer for {gold_path}: {e}")
+            for result in group_results:
+                if result["status"] == "ok":
+                    result["status"] = "gold_failed"
+                    result["error"] = str(e)
+
+
+def get_max_workers(sources, configured_workers=None, max_workers=None):
+    return min(max_workers or configured_workers or len(sources), len(sources))
+
+
+def ignore_stop_signals():
+    # Workers finish their current source; the parent decides when the pool shuts down.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+
+def create_executor(max_workers):
+    # Spawned workers start clean instead of inheriting the parent's open Delta tables.
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=ignore_stop_signals
+    )
+
+
+def run_sources(config_path, land_raw=False, max_workers=None):
+    sources, configured_workers = load_sources(config_path)
+    max_workers = get_max_workers(sources, configured_workers, max_workers)
+
+    with create_executor(max_workers) as executor:
+        return run_sources_with_executor(sources, executor, max_workers, land_raw=land_raw)
+
+
+def run_sources_with_executor(sources, executor, max_workers, land_raw=False):
+    print("=" * 50)
+    print(f"Starting ETL Pipeline for {len(sources)} sources with {max_workers} workers")
+    print("=" * 50)
+
+    results = []
+    futures = {executor.submit(run_source, source, land_raw): source for source in sources}
+
+    for future in as_completed(futures):
+        source = futures[future]
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"name": source["name"], "status": "failed", "error": str(e)}
+        results.append(result)
+
+    run_gold(sources, results)
+
+    print("\n" + "=" * 50)
+    for result in sorted(results, key=lambda result: result["name"]):
+        error = f" ({result['error']})" if result.get("error") else ""
+        print(f"{result['name']}: {result['status']}{error}")
+    print("=" * 50)
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the ETL pipeline for every configured source")
+    parser.add_argument("config", help="JSON file listing the sources")
+    parser.add_argument("--land-raw", action="store_true", help="Persist raw API responses to the landing zone")
+    parser.add_argument("--workers", type=int, default=None, help="Maximum number of sources run at once")
+    args = parser.parse_args()
+
+    run_sources(args.config, land_raw=args.land_raw, max_workers=args.workers)
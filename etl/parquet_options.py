@@ -0,0 +1,93 @@
+from deltalake import WriterProperties
+import pyarrow.dataset as ds
+
+
+PARQUET_COMPRESSION = "zstd"
+PARQUET_COMPRESSION_LEVEL = 3
+LEVELED_CODECS = ("zstd", "gzip", "brotli")
+MIN_ROWS_PER_GROUP = 64 * 1024
+MAX_ROWS_PER_GROUP = 128 * 1024
+MAX_ROWS_PER_FILE = 1024 * 1024
+TARGET_FILE_SIZE = 128 * 1024 * 1024
+
+# Columns with a handful of distinct values (countries, cities, agents...). Other
+# columns skip the dictionary attempt, which free text like description never fits.
+DICTIONARY_COLUMNS = {
+    "bronze": [
+        "property_type", "location.city", "location.state", "location.country", "location.neighborhood",
+        "pricing.currency", "status.property_status", "agent.name", "agent.email", "agent.phone",
+        "agent.company"
+    ],
+    "silver": [
+        "property_type", "location_city", "location_state", "location_country", "location_neighborhood",
+        "pricing_currency", "status_property_status", "agent_name", "agent_email", "agent_phone",
+        "agent_company"
+    ]
+}
+
+# Statistics are only kept for columns that are filtered on. They also become the
+# per-file stats in the Delta log, so long text columns would bloat every add action.
+STATISTICS_COLUMNS = {
+    "bronze": [
+        "id", "property_type", "location.country", "pricing.price",
+        "dates.published_at", "dates.updated_at"
+    ],
+    "silver": [
+        "id", "property_type", "location_city", "location_country", "location_geohash",
+        "location_coordinates_latitude", "location_coordinates_longitude", "pricing_price",
+        "published_at", "updated_at", "expires_at"
+    ]
+}
+
+
+def get_parquet_options(layer, overrides=None):
+    options = {
+        "compression": PARQUET_COMPRESSION,
+        "compression_level": PARQUET_COMPRESSION_LEVEL,
+        "min_rows_per_group": MIN_ROWS_PER_GROUP,
+        "max_rows_per_group": MAX_ROWS_PER_GROUP,
+        "max_rows_per_file": MAX_ROWS_PER_FILE,
+        "target_file_size": TARGET_FILE_SIZE,
+        "dictionary_columns": DICTIONARY_COLUMNS[layer],
+        "statistics_columns": STATISTICS_COLUMNS[layer]
+    }
+    options.update(overrides or {})
+    return options
+
+
+def get_write_options(options):
+    # Keyword arguments for write_deltalake, which writes through pyarrow.
+    leveled = options["compression"].lower() in LEVELED_CODECS
+    file_options = ds.ParquetFileFormat().make_write_options(
+        compression=options["compression"],
+        compression_level=options["compression_level"] if leveled else None,
+        use_dictionary=options["dictionary_columns"],
+        write_statistics=options["statistics_columns"]
+    )
+
+    return {
+        "file_options": file_options,
+        "min_rows_per_group": options["min_rows_per_group"],
+        "max_rows_per_group": options["max_rows_per_group"],
+        "max_rows_per_file": options["max_rows_per_file"]
+    }
+
+
+def get_writer_properties(options):
+    # Merges and compaction write through the Rust writer, which takes the codec,
+    # level and row-group size but not per-column dictionary or statistics settings.
+    leveled = options["compression"].lower() in LEVELED_CODECS
+    return WriterProperties(
+        compression=options["compression"].lower(),
+        compression_level=options["compression_level"] if leveled else None,
+        max_row_group_size=options["max_rows_per_group"]
+    )
+
+
+def compact_table(dt, options):
+    metrics = dt.optimize.compact(
+        target_size=options["target_file_size"],
+        writer_properties=get_writer_properties(options)
+    )
+    print(f"Compacted {metrics['numFilesRemoved']} files into {metrics['numFilesAdded']} in {dt.table_uri}")
+    return metrics
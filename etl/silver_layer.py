@@ -1,13 +1,38 @@
+import json
+import numpy as np
 import pandas as pd
-from deltalake import DeltaTable, write_deltalake
+from deltalake import write_deltalake
 from pathlib import Path
 import os
 import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from typing import NamedTuple, Optional
+
+from data_quality import COERCION_FAILURES_COLUMN, QUARANTINE_PATH, validate_batch, write_quarantine
+from id_index import build_id_index, create_id_index, load_id_index, lookup_partitions, save_id_index, update_id_index
+from parquet_options import get_parquet_options, get_write_options, get_writer_properties
+from table_cache import get_table
+from table_lock import table_lock
 
 
 BRONZE_PATH = str(Path("../datalake/bronze/realestateapi/").resolve())
 SILVER_PATH = str(Path("../datalake/silver/realestateapi/").resolve())
 
+SILVER_MODES = ("versioned", "latest")
+SILVER_MODE_PROPERTY = "realestate.silverMode"
+
+
+class SilverCommit(NamedTuple):
+    df_merged: pd.DataFrame
+    df_replaced: Optional[pd.DataFrame]
+    base_version: int
+    version: int
+
+
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 7
+
 
 def get_schema():
     return pa.schema([
@@ -23,6 +48,7 @@ def get_schema():
         pa.field("location_zip_code", pa.string()),
         pa.field("location_coordinates_latitude", pa.float64()),
         pa.field("location_coordinates_longitude", pa.float64()),
+        pa.field("location_geohash", pa.string()),
         pa.field("pricing_price", pa.float64()),
         pa.field("pricing_currency", pa.string()),
         pa.field("pricing_price_per_sqm", pa.float64()),
@@ -52,6 +78,108 @@ def get_schema():
     ])
 
 
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    # Reference bit-by-bit encoder; silver uses encode_geohashes on whole columns.
+    if pd.isna(latitude) or pd.isna(longitude):
+        return None
+
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even_bit = True
+
+    while len(geohash) < precision:
+        value_range, value = (lon_range, longitude) if even_bit else (lat_range, latitude)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            value_range[0] = mid
+        else:
+            bits = bits << 1
+            value_range[1] = mid
+        even_bit = not even_bit
+
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(geohash)
+
+
+def encode_geohashes(latitudes, longitudes, precision=GEOHASH_PRECISION):
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    geohashes = np.full(len(latitudes), None, dtype=object)
+
+    valid = ~(np.isnan(latitudes) | np.isnan(longitudes))
+    if not valid.any():
+        return geohashes
+
+    # A geohash interleaves longitude and latitude bits, longitude first, so each
+    # coordinate is quantized to a grid of 2**bits cells covering its range.
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    lon_cells = quantize_coordinates(longitudes[valid], -180.0, 180.0, lon_bits)
+    lat_cells = quantize_coordinates(latitudes[valid], -90.0, 90.0, lat_bits)
+
+    codes = np.zeros(len(lon_cells), dtype=np.int64)
+    for bit in range(total_bits):
+        if bit % 2 == 0:
+            next_bit = (lon_cells >> (lon_bits - 1 - bit // 2)) & 1
+        else:
+            next_bit = (lat_cells >> (lat_bits - 1 - bit // 2)) & 1
+        codes = (codes << 1) | next_bit
+
+    alphabet = np.frombuffer(GEOHASH_BASE32.encode("ascii"), dtype=np.uint8)
+    shifts = 5 * np.arange(precision - 1, -1, -1, dtype=np.int64)
+    characters = alphabet[(codes[:, None] >> shifts) & 31]
+    geohashes[valid] = characters.view(f"S{precision}").ravel().astype(str)
+    return geohashes
+
+
+def quantize_coordinates(values, minimum, maximum, bits):
+    cells = np.floor((values - minimum) / (maximum - minimum) * (1 << bits))
+    return np.clip(cells, 0, (1 << bits) - 1).astype(np.int64)
+
+
+def add_geohash_column(df):
+    df['location_geohash'] = encode_geohashes(
+        df['location_coordinates_latitude'].to_numpy(dtype=np.float64, na_value=np.nan),
+        df['location_coordinates_longitude'].to_numpy(dtype=np.float64, na_value=np.nan)
+    )
+    return df
+
+
+def ensure_silver_schema(dt_silver, silver_path=SILVER_PATH, partition_by=("published_date",), parquet_options=None):
+    missing_columns = set(get_schema().names) - set(dt_silver.schema().to_pyarrow().names)
+
+    if not missing_columns:
+        return dt_silver
+
+    print(f"Migrating silver table to add columns: {sorted(missing_columns)}")
+
+    df_existing = dt_silver.to_pandas()
+    if 'location_geohash' in missing_columns:
+        df_existing = add_geohash_column(df_existing)
+    df_existing = df_existing.sort_values(['published_date', 'location_geohash'])
+
+    write_deltalake(
+        dt_silver,
+        pa.Table.from_pandas(df_existing, schema=get_schema(), preserve_index=False),
+        mode="overwrite",
+        overwrite_schema=True,
+        partition_by=list(partition_by),
+        **get_write_options(parquet_options or get_parquet_options("silver"))
+    )
+
+    return get_table(silver_path)
+
+
 def transform_bronze_to_silver(df):
     df_transformed = df.copy()
 
@@ -88,92 +216,475 @@ def transform_bronze_to_silver(df):
         'agent.company': 'agent_company',
         'dates.published_at': 'published_at',
         'dates.updated_at': 'updated_at',
-        'dates.expires_at': 'expires_at'
+        'dates.expires_at': 'expires_at',
+        'quality.coercion_failures': COERCION_FAILURES_COLUMN
     })
 
     df_transformed['published_at'] = pd.to_datetime(df_transformed['published_at'], format='mixed')
     df_transformed['updated_at'] = pd.to_datetime(df_transformed['updated_at'], format='mixed')
     df_transformed['expires_at'] = pd.to_datetime(df_transformed['expires_at'], format='mixed')
 
+    # Sorting by geohash keeps nearby listings in the same row groups within each partition.
+    df_transformed = add_geohash_column(df_transformed)
+    df_transformed = df_transformed.sort_values(['published_date', 'location_geohash']).reset_index(drop=True)
+
     return df_transformed
 
 
-def load_to_silver():
-    print("Reading data from bronze layer")
+def build_scope_filter(scope):
+    if not scope:
+        return None
+
+    expression = None
+    for column, value in scope.items():
+        condition = ds.field(column) == value
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def build_scope_predicate(scope):
+    predicate = ""
+    for column, value in (scope or {}).items():
+        escaped = str(value).replace("'", "''")
+        predicate += f" AND target.{column} = '{escaped}'"
+    return predicate
+
+
+def check_scope(df_silver, scope):
+    for column, value in (scope or {}).items():
+        out_of_scope = int((df_silver[column] != value).sum())
+        if out_of_scope:
+            raise ValueError(f"{out_of_scope} records have {column} outside the source scope {value!r}")
+
+
+def get_replaced_rows(dt_silver, df_silver, scope=None):
+    published_dates = sorted(set(df_silver['published_date']))
+    conditions = [("published_date", published_dates)]
+    conditions += [(column, [value]) for column, value in (scope or {}).items()]
+
+    # Partition columns are pruned from the Delta log before any file is opened;
+    # any other column is filtered during the scan.
+    partition_columns = dt_silver.metadata().partition_columns
+    partitions = []
+    expression = None
+    for column, values in conditions:
+        if column in partition_columns:
+            partitions.append((column, "in", [str(value) for value in values]))
+        else:
+            condition = ds.field(column).isin(values)
+            expression = condition if expression is None else expression & condition
+
+    dataset = dt_silver.to_pyarrow_dataset(partitions=partitions or None)
+    df_existing = dataset.to_table(filter=expression).to_pandas()
+
+    if df_existing.empty:
+        return df_existing
+
+    keys = df_silver[['id', 'published_at']]
+    return df_existing.merge(keys, on=['id', 'published_at'], how='inner')
+
+
+def keep_latest_versions(df_silver):
+    # Stable sort keeps the last extracted row when updated_at ties; the kept rows
+    # stay in their original (published_date, geohash) order.
+    latest_index = (
+        df_silver.sort_values('updated_at', kind='stable', na_position='first')
+        .drop_duplicates(subset=['id'], keep='last')
+        .index
+    )
+    return df_silver[df_silver.index.isin(latest_index)].reset_index(drop=True)
+
+
+def get_batch_partitions(df_silver, partition_columns):
+    return {column: sorted({str(value) for value in df_silver[column]}) for column in partition_columns}
+
+
+def combine_partitions(partitions, other_partitions):
+    return {
+        column: sorted(set(values) | set(other_partitions.get(column, [])))
+        for column, values in partitions.items()
+    }
+
+
+def build_partition_predicate(partitions):
+    predicate = ""
+    for column, values in (partitions or {}).items():
+        escaped = ", ".join("'" + str(value).replace("'", "''") + "'" for value in values)
+        predicate += f" AND target.{column} IN ({escaped})"
+    return predicate
+
+
+def check_silver_mode(dt_silver, mode):
+    # Tables created before the mode was stored were all written in versioned mode.
+    table_mode = dt_silver.metadata().configuration.get(SILVER_MODE_PROPERTY, "versioned")
+    if table_mode != mode:
+        raise ValueError(f"Silver table was created in {table_mode!r} mode, refusing to merge in {mode!r} mode")
+
+
+def get_silver_id_index(dt_silver, silver_path):
+    index = load_id_index(silver_path, dt_silver.version())
+
+    if index is None:
+        index = build_id_index(dt_silver)
+        if index is not None:
+            print(f"Rebuilt silver id index with {index.num_rows} entries")
+            save_id_index(silver_path, index, dt_silver.version())
+
+    return index
+
+
+def get_latest_changes(dt_silver, df_silver, scope=None, partitions=None):
+    # The current version of an id can sit in any published_date partition; the id
+    # index narrows that down to the partitions that hold the incoming ids.
+    expression = ds.field("id").isin(df_silver['id'].tolist())
+    scope_filter = build_scope_filter(scope)
+    if scope_filter is not None:
+        expression = expression & scope_filter
+
+    partition_filters = [(column, "in", values) for column, values in (partitions or {}).items()]
+    dataset = dt_silver.to_pyarrow_dataset(partitions=partition_filters or None)
+    df_existing = dataset.to_table(filter=expression).to_pandas()
+    if df_existing.empty:
+        return df_silver, df_existing
+
+    current_updated_at = df_existing.groupby('id')['updated_at'].max()
+
+    # Same rule as the merge guard: new ids are inserted and existing ids are only
+    # replaced by a strictly newer updated_at.
+    is_new = ~df_silver['id'].isin(current_updated_at.index)
+    is_newer = df_silver['updated_at'] > df_silver['id'].map(current_updated_at)
+
+    df_changes = df_silver[is_new | is_newer].reset_index(drop=True)
+    df_replaced = df_existing[df_existing['id'].isin(df_silver.loc[is_newer, 'id'])].reset_index(drop=True)
+    return df_changes, df_replaced
+
 
+def get_max_timestamp(dt_silver, column, scope=None):
+    actions = dt_silver.get_add_actions(flatten=True)
+    if actions.num_rows == 0:
+        return None
+
+    scope = scope or {}
+    partition_columns = {scope_column: f"partition.{scope_column}" for scope_column in scope}
+    stats_column = f"max.{column}"
+
+    # File statistics answer this without reading any data files, as long as the
+    # scope columns are partition columns and can be matched per file.
+    if all(partition_column in actions.column_names for partition_column in partition_columns.values()):
+        for scope_column, value in scope.items():
+            actions = actions.filter(pc.equal(actions[partition_columns[scope_column]], value))
+        if actions.num_rows == 0:
+            return None
+        if stats_column in actions.column_names and actions[stats_column].null_count == 0:
+            return pc.max(actions[stats_column]).as_py()
+
+    table = dt_silver.to_pyarrow_dataset().to_table(columns=[column], filter=build_scope_filter(scope))
+    return pc.max(table[column]).as_py()
+
+
+def get_consumed_bronze_path(silver_path):
+    silver_path = Path(silver_path)
+    return silver_path.parent / f".{silver_path.name}.consumed_bronze.json"
+
+
+def read_consumed_bronze(silver_path, bronze_path):
+    try:
+        with open(get_consumed_bronze_path(silver_path)) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    consumed = state.get(str(Path(bronze_path).resolve()))
+    if consumed is None:
+        return None
+
+    return {
+        "version": consumed["version"],
+        "max_published_at": pd.Timestamp(consumed["max_published_at"]) if consumed["max_published_at"] else None,
+        "max_updated_at": pd.Timestamp(consumed["max_updated_at"]) if consumed["max_updated_at"] else None
+    }
+
+
+def write_consumed_bronze(silver_path, bronze_path, version, max_published_at, max_updated_at):
+    # Called under the silver lock; sources sharing this silver table each keep an
+    # entry keyed by their bronze path.
+    path = get_consumed_bronze_path(silver_path)
+    tmp_path = path.with_suffix(".tmp")
+
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+
+    state[str(Path(bronze_path).resolve())] = {
+        "version": version,
+        "max_published_at": max_published_at.isoformat() if max_published_at is not None else None,
+        "max_updated_at": max_updated_at.isoformat() if max_updated_at is not None else None
+    }
+
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def carry_consumed_bronze(silver_path, bronze_path, bronze_version, new_bronze_version):
+    # For bronze commits that do not add rows (compaction), so the next batch can
+    # still be handed off.
+    with table_lock(silver_path):
+        consumed = read_consumed_bronze(silver_path, bronze_path)
+        if consumed is not None and consumed["version"] == bronze_version:
+            write_consumed_bronze(
+                silver_path, bronze_path, new_bronze_version, consumed["max_published_at"], consumed["max_updated_at"]
+            )
+
+
+def latest_timestamp(*values):
+    values = [value for value in values if value is not None and not pd.isna(value)]
+    return max(values) if values else None
+
+
+def read_bronze_from_disk(max_published_at, bronze_path=BRONZE_PATH):
     try:
-        dt_bronze = DeltaTable(BRONZE_PATH)
+        dt_bronze = get_table(bronze_path)
     except Exception as e:
         print(f"Error reading bronze layer: {e}")
-        return
+        return None, None
+
+    if max_published_at is None:
+        return dt_bronze.to_pandas(), dt_bronze.version()
 
-    Path(SILVER_PATH).parent.mkdir(parents=True, exist_ok=True)
+    # Only partitions from the silver high-water mark onwards can hold new rows.
+    dataset = dt_bronze.to_pyarrow_dataset()
+    df_bronze = dataset.to_table(filter=ds.field("published_date") >= max_published_at.date()).to_pandas()
+    return df_bronze, dt_bronze.version()
+
+
+def can_use_bronze_batch(bronze_batch, silver_exists, consumed):
+    if bronze_batch is None:
+        return False
+    if not silver_exists:
+        return bronze_batch.previous_max_published_at is None
+    if consumed is None:
+        return False
+    # Silver must already have consumed every bronze commit before this batch, whether
+    # its rows were merged, quarantined or dropped as stale versions.
+    return consumed["version"] >= bronze_batch.version - 1
+
+
+def load_to_silver(bronze_batch=None, bronze_path=BRONZE_PATH, silver_path=SILVER_PATH,
+                   partition_by=("published_date",), scope=None, quarantine_path=QUARANTINE_PATH,
+                   mode="versioned", parquet_options=None):
+    if mode not in SILVER_MODES:
+        raise ValueError(f"Unknown silver mode {mode!r}, expected one of {SILVER_MODES}")
+
+    parquet_options = parquet_options or get_parquet_options("silver")
+
+    Path(silver_path).parent.mkdir(parents=True, exist_ok=True)
 
     try:
-        dt_silver = DeltaTable(SILVER_PATH)
+        dt_silver = get_table(silver_path)
         silver_exists = True
     except Exception:
         silver_exists = False
 
     if silver_exists:
-        df_silver_existing = dt_silver.to_pandas()
-        if not df_silver_existing.empty:
-            max_published_at = df_silver_existing['published_at'].max()
-            print(f"Silver layer exists. Max published_at: {max_published_at}")
+        check_silver_mode(dt_silver, mode)
+
+    # Bronze rows silver has consumed include rows it quarantined or dropped as stale
+    # versions, so the recorded marks can be ahead of silver's own maximums.
+    consumed = read_consumed_bronze(silver_path, bronze_path) if silver_exists else None
+
+    max_published_at = None
+    max_updated_at = None
+    if silver_exists:
+        max_published_at = latest_timestamp(
+            get_max_timestamp(dt_silver, "published_at", scope),
+            consumed["max_published_at"] if consumed else None
+        )
+        if mode == "latest":
+            max_updated_at = latest_timestamp(
+                get_max_timestamp(dt_silver, "updated_at", scope),
+                consumed["max_updated_at"] if consumed else None
+            )
 
-            df_bronze = dt_bronze.to_pandas()
-            df_bronze['dates.published_at'] = pd.to_datetime(df_bronze['dates.published_at'], format='mixed')
-            df_bronze = df_bronze[df_bronze['dates.published_at'] > max_published_at]
+    if max_published_at is not None:
+        print(f"Silver layer exists. Max published_at: {max_published_at}")
 
-            if df_bronze.empty:
-                print("No new records to process")
-                return
+    if can_use_bronze_batch(bronze_batch, silver_exists, consumed):
+        print(f"Using {bronze_batch.table.num_rows} records handed off from bronze version {bronze_batch.version}")
+        df_bronze = bronze_batch.table.to_pandas()
+        bronze_version = bronze_batch.version
+    else:
+        if bronze_batch is not None:
+            print("Silver is behind bronze, reading bronze from disk")
+        print("Reading data from bronze layer")
+        df_bronze, bronze_version = read_bronze_from_disk(max_published_at, bronze_path)
+        if df_bronze is None:
+            return None
 
-            print(f"Found {len(df_bronze)} new records from bronze")
-        else:
-            df_bronze = dt_bronze.to_pandas()
-            print(f"Loaded {len(df_bronze)} records from bronze")
+    df_bronze['dates.published_at'] = pd.to_datetime(df_bronze['dates.published_at'], format='mixed')
+    df_bronze['dates.updated_at'] = pd.to_datetime(df_bronze['dates.updated_at'], format='mixed')
+
+    # Everything read here counts as consumed once this run finishes, whatever
+    # happens to the individual rows.
+    consumed_marks = (
+        bronze_version,
+        latest_timestamp(max_published_at, df_bronze['dates.published_at'].max()),
+        latest_timestamp(max_updated_at, df_bronze['dates.updated_at'].max())
+    )
+
+    if max_published_at is not None:
+        is_new = df_bronze['dates.published_at'] > max_published_at
+
+        # In latest mode, listings published earlier still count when they were updated since.
+        if max_updated_at is not None:
+            is_new = is_new | (df_bronze['dates.updated_at'] > max_updated_at)
+
+        df_bronze = df_bronze[is_new]
+
+        if df_bronze.empty:
+            with table_lock(silver_path):
+                write_consumed_bronze(silver_path, bronze_path, *consumed_marks)
+            print("No new records to process")
+            return None
+
+        print(f"Found {len(df_bronze)} new records from bronze")
     else:
-        df_bronze = dt_bronze.to_pandas()
         print(f"Loaded {len(df_bronze)} records from bronze")
 
     if df_bronze.empty:
         print("No data in bronze layer")
-        return
+        return None
 
     df_silver = transform_bronze_to_silver(df_bronze)
+    check_scope(df_silver, scope)
 
-    if not silver_exists:
-        print("Creating silver table")
-        write_deltalake(
-            SILVER_PATH,
-            df_silver,
-            mode="overwrite",
-            schema=get_schema(),
-            partition_by=["published_date"]
-        )
-        print(f"Successfully created silver table with {len(df_silver)} records")
-    else:
-        print("Merging data into silver table")
+    if mode == "latest":
+        batch_size = len(df_silver)
+        df_silver = keep_latest_versions(df_silver)
+        print(f"Kept the latest version of {len(df_silver)} listings out of {batch_size} records")
 
-        dt_silver = DeltaTable(SILVER_PATH)
+    # Sources that share this table commit one at a time; the table is reopened
+    # under the lock so each merge sees the previous source's commit.
+    with table_lock(silver_path):
+        try:
+            dt_silver = get_table(silver_path)
+            silver_exists = True
+        except Exception:
+            silver_exists = False
 
-        source_table = pa.Table.from_pandas(df_silver, schema=get_schema())
+        df_replaced = None
+        if silver_exists:
+            check_silver_mode(dt_silver, mode)
+            dt_silver = ensure_silver_schema(dt_silver, silver_path, partition_by, parquet_options)
+            partition_columns = dt_silver.metadata().partition_columns
+            id_index = get_silver_id_index(dt_silver, silver_path)
+            base_version = dt_silver.version()
 
-        (
-            dt_silver.merge(
-                source=source_table,
-                predicate="target.id = source.id AND target.published_at = source.published_at",
-                source_alias="source",
-                target_alias="target"
+            # Matches can only be in the batch's own partitions (versioned mode) or in the
+            # partitions the id index lists for the incoming ids (latest mode). Naming them
+            # in the predicate keeps the merge from scanning every other partition.
+            partitions = get_batch_partitions(df_silver, partition_columns)
+
+            if mode == "latest":
+                if id_index is None:
+                    partitions = None
+                else:
+                    partitions = combine_partitions(partitions, lookup_partitions(id_index, df_silver['id']))
+
+                df_silver, df_replaced = get_latest_changes(dt_silver, df_silver, scope, partitions)
+
+                if df_silver.empty:
+                    write_consumed_bronze(silver_path, bronze_path, *consumed_marks)
+                    print("No newer versions to merge into silver table")
+                    return None
+
+        # Validation runs on the final merge input, so stale versions that would not be
+        # merged are not quarantined. Quarantined rows are written once silver has
+        # committed, so a failed merge does not leave them behind to be added again.
+        source_table = pa.Table.from_pandas(df_silver, schema=get_schema(), preserve_index=False)
+
+        passed, quarantined = validate_batch(source_table, df_silver.get(COERCION_FAILURES_COLUMN))
+        df_silver = df_silver.drop(columns=[COERCION_FAILURES_COLUMN], errors='ignore')
+        if quarantined is not None:
+            source_table = source_table.filter(passed)
+            df_silver = df_silver[passed.to_numpy(zero_copy_only=False)].reset_index(drop=True)
+            if df_replaced is not None:
+                df_replaced = df_replaced[df_replaced['id'].isin(df_silver['id'])].reset_index(drop=True)
+
+        if df_silver.empty:
+            if quarantined is not None:
+                write_quarantine(quarantined, quarantine_path)
+            write_consumed_bronze(silver_path, bronze_path, *consumed_marks)
+            print("No valid records to load into silver layer")
+            return None
+
+        if not silver_exists:
+            print("Creating silver table")
+            write_deltalake(
+                silver_path,
+                source_table,
+                mode="overwrite",
+                partition_by=list(partition_by),
+                configuration={SILVER_MODE_PROPERTY: mode},
+                **get_write_options(parquet_options)
             )
-            .when_matched_update_all()
-            .when_not_matched_insert_all()
-            .execute()
-        )
+            version = get_table(silver_path).version()
+            save_id_index(silver_path, create_id_index(source_table, list(partition_by)), version)
+            if quarantined is not None:
+                write_quarantine(quarantined, quarantine_path)
+            write_consumed_bronze(silver_path, bronze_path, *consumed_marks)
+            print(f"Successfully created silver table with {len(df_silver)} records")
+            return SilverCommit(df_silver, None, -1, version)
+
+        print("Merging data into silver table")
+
+        if mode == "latest":
+            (
+                dt_silver.merge(
+                    source=source_table,
+                    predicate="target.id = source.id" + build_scope_predicate(scope)
+                              + build_partition_predicate(partitions),
+                    source_alias="source",
+                    target_alias="target",
+                    writer_properties=get_writer_properties(parquet_options)
+                )
+                .when_matched_update_all(predicate="source.updated_at > target.updated_at")
+                .when_not_matched_insert_all()
+                .execute()
+            )
+        else:
+            df_replaced = get_replaced_rows(dt_silver, df_silver, scope)
+
+            (
+                dt_silver.merge(
+                    source=source_table,
+                    predicate="target.id = source.id AND target.published_at = source.published_at"
+                              + build_scope_predicate(scope) + build_partition_predicate(partitions),
+                    source_alias="source",
+                    target_alias="target",
+                    writer_properties=get_writer_properties(parquet_options)
+                )
+                .when_matched_update_all()
+                .when_not_matched_insert_all()
+                .execute()
+            )
+
+        if id_index is not None:
+            # Replaced listings may have moved partition, so their old entries are dropped.
+            removed = None
+            if mode == "latest":
+                removed = pa.Table.from_pandas(df_replaced[['id'] + partition_columns], preserve_index=False)
+            added = pa.Table.from_pandas(df_silver[['id'] + partition_columns], preserve_index=False)
+            save_id_index(silver_path, update_id_index(id_index, added, removed), dt_silver.version())
 
-        print(f"Successfully merged {len(df_silver)} records into silver table")
+        if quarantined is not None:
+            write_quarantine(quarantined, quarantine_path)
+        write_consumed_bronze(silver_path, bronze_path, *consumed_marks)
 
+    print(f"Successfully merged {len(df_silver)} records into silver table")
+    return SilverCommit(df_silver, df_replaced, base_version, dt_silver.version())
 
 if __name__ == "__main__":
     load_to_silver()
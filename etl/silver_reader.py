@@ -0,0 +1,115 @@
+from datetime import date, datetime
+from pathlib import Path
+import pyarrow.dataset as ds
+
+from id_index import load_id_index, lookup_partitions
+from parquet_options import DICTIONARY_COLUMNS
+from table_cache import get_table
+
+
+SILVER_PATH = str(Path("../datalake/silver/realestateapi/").resolve())
+
+
+def get_silver_table(table_path=SILVER_PATH, refresh=False):
+    return get_table(table_path, refresh=refresh)
+
+
+def parse_date(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(value).date()
+
+
+def build_filter_expression(from_date=None, to_date=None, country=None, property_type=None,
+                            min_price=None, max_price=None):
+    conditions = []
+
+    # published_date is the partition column, so these prune whole directories.
+    if from_date is not None:
+        conditions.append(ds.field("published_date") >= parse_date(from_date))
+    if to_date is not None:
+        conditions.append(ds.field("published_date") <= parse_date(to_date))
+
+    # The remaining conditions are checked against file and row-group statistics
+    # before any data page is decoded.
+    if country is not None:
+        countries = [country] if isinstance(country, str) else list(country)
+        conditions.append(ds.field("location_country").isin(countries))
+    if property_type is not None:
+        property_types = [property_type] if isinstance(property_type, str) else list(property_type)
+        conditions.append(ds.field("property_type").isin(property_types))
+    if min_price is not None:
+        conditions.append(ds.field("pricing_price") >= float(min_price))
+    if max_price is not None:
+        conditions.append(ds.field("pricing_price") <= float(max_price))
+
+    if not conditions:
+        return None
+
+    expression = conditions[0]
+    for condition in conditions[1:]:
+        expression = expression & condition
+    return expression
+
+
+def get_id_dataset(dt, table_path, ids):
+    # Point lookups only open the partitions the id index lists for these ids. Without
+    # a current index the id filter still skips files through their id statistics.
+    index = load_id_index(table_path, dt.version())
+    if index is None:
+        return dt.to_pyarrow_dataset()
+
+    partitions = lookup_partitions(index, ids)
+    if any(not values for values in partitions.values()):
+        return None
+    return dt.to_pyarrow_dataset(partitions=[(column, "in", values) for column, values in partitions.items()])
+
+
+def read_silver(from_date=None, to_date=None, columns=None, country=None, property_type=None,
+                min_price=None, max_price=None, as_pandas=True, table_path=SILVER_PATH, refresh=False,
+                categorical=False, ids=None):
+    dt = get_silver_table(table_path, refresh=refresh)
+
+    expression = build_filter_expression(
+        from_date=from_date,
+        to_date=to_date,
+        country=country,
+        property_type=property_type,
+        min_price=min_price,
+        max_price=max_price
+    )
+
+    if ids is None:
+        dataset = dt.to_pyarrow_dataset()
+    else:
+        ids = [int(value) for value in ids]
+        dataset = get_id_dataset(dt, table_path, ids)
+        id_condition = ds.field("id").isin(ids)
+        expression = id_condition if expression is None else expression & id_condition
+
+    if dataset is None:
+        # None of the ids are in the table.
+        schema = dt.to_pyarrow_dataset().schema
+        table = schema.empty_table().select(columns or schema.names)
+    else:
+        table = dataset.to_table(columns=columns, filter=expression)
+
+    if categorical:
+        # Low-cardinality strings become dictionary arrays (pandas categoricals).
+        for name in DICTIONARY_COLUMNS["silver"]:
+            if name in table.column_names:
+                index = table.column_names.index(name)
+                table = table.set_column(index, name, table[name].dictionary_encode())
+
+    if as_pandas:
+        return table.to_pandas()
+    return table
+
+
+if __name__ == "__main__":
+    df = read_silver(columns=["id", "location_country", "property_type", "pricing_price", "published_date"])
+    print(f"Read {len(df)} records from silver layer")
@@ -0,0 +1,26 @@
+from deltalake import DeltaTable
+
+
+_table_cache = {}
+
+
+def get_table(table_path, refresh=True):
+    dt = _table_cache.get(table_path)
+
+    if dt is not None and refresh:
+        try:
+            # Only replays the log entries committed since the cached version.
+            dt.update_incremental()
+        except Exception:
+            _table_cache.pop(table_path, None)
+            dt = None
+
+    if dt is None:
+        dt = DeltaTable(table_path)
+        _table_cache[table_path] = dt
+
+    return dt
+
+
+def clear_table_cache():
+    _table_cache.clear()